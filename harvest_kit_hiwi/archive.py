@@ -0,0 +1,202 @@
+import os
+import re
+import json
+import sqlite3
+import functools
+from collections.abc import Mapping
+from typing import Optional, Tuple, Dict, Iterator
+
+from harvest_kit_hiwi.util import atomic_write
+from harvest_kit_hiwi.processing import ArbeitszeitData
+
+ARCHIVE_INDEX_NAME = 'index.sqlite'
+ARCHIVE_FILE_PATTERN = re.compile(r'^(?P<year>\d{4})_(?P<month>\d{1,2})\.json$')
+
+
+def archive_file_name(month: int, year: int) -> str:
+    return f'{year}_{month}.json'
+
+
+def parse_archive_file_name(file_name: str) -> Optional[Tuple[int, int]]:
+    """
+    Returns the tuple (month, year) which is encoded in the given archive `file_name` or None if the name does
+    not have the format of an archive file.
+    """
+    match = ARCHIVE_FILE_PATTERN.match(file_name)
+    if match is None:
+        return None
+
+    return int(match.group('month')), int(match.group('year'))
+
+
+@functools.lru_cache(maxsize=64)
+def _read_archive_file(path: str, mtime: float) -> dict:
+    # The modification time is part of the cache key, so that modified files are loaded again
+    with open(path, mode='r') as file:
+        return json.load(file)
+
+
+def load_archive_file(path: str) -> ArbeitszeitData:
+    """
+    Loads the ``ArbeitszeitData`` from the archive file at `path`. The contents of the most recently loaded
+    files are kept in an in-process LRU cache, so that accessing the same month multiple times only reads and
+    decodes it once. Every call still returns a new object, which the caller is free to modify.
+    """
+    return ArbeitszeitData.from_dict(_read_archive_file(os.path.abspath(path), os.path.getmtime(path)))
+
+
+class ArchiveFolder(Mapping):
+    """
+    A read-only, lazy mapping of the keys (month, year) to the ``ArbeitszeitData`` archived in the folder
+    `folder_path`.
+
+    The keys are determined from the file names alone, without opening any of the files. A file is only
+    loaded and deserialized once its month is actually accessed. Thus, creating this mapping only costs a
+    single directory listing, no matter how many months have been archived.
+
+    .. code-block:: python
+
+        archive = ArchiveFolder('azd_archive')
+        if (9, 2022) in archive:
+            azd_prev = archive[(9, 2022)]
+
+    """
+    def __init__(self, folder_path: str):
+        self.folder_path = folder_path
+
+        self.paths: Dict[Tuple[int, int], str] = {}
+        if os.path.isdir(self.folder_path):
+            for file in os.listdir(self.folder_path):
+                key = parse_archive_file_name(file)
+                if key is not None:
+                    self.paths[key] = os.path.join(self.folder_path, file)
+
+    def __getitem__(self, key: Tuple[int, int]) -> ArbeitszeitData:
+        month, year = key
+        return load_archive_file(self.paths[(int(month), int(year))])
+
+    def __contains__(self, key) -> bool:
+        month, year = key
+        return (int(month), int(year)) in self.paths
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return iter(sorted(self.paths, key=lambda key: (key[1], key[0])))
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+
+class ArchiveIndex:
+    """
+    An index of the archived ``ArbeitszeitData`` JSON files inside the folder `archive_path`, which is stored
+    as an SQLite database in that same folder. The JSON files remain the actual archive, the index only maps
+    the keys (person, year, month) to the corresponding files. This way looking up a single month, such as
+    the previous month for the carry over, only requires a single query and reading a single file regardless
+    of how many months and people have been archived.
+
+    Archives which were created before the index existed can be imported with ``import_folder``, which
+    indexes the files of a folder by the month and year encoded in their names.
+
+    .. code-block:: python
+
+        index = ArchiveIndex('azd_archive')
+        index.write('1982907', azd_data)
+        azd_prev = index.get('1982907', month=9, year=2022)
+
+    """
+    def __init__(self, archive_path: str):
+        self.archive_path = archive_path
+        if not os.path.exists(self.archive_path):
+            os.makedirs(self.archive_path)
+
+        self.path = os.path.join(self.archive_path, ARCHIVE_INDEX_NAME)
+        self.connection = sqlite3.connect(self.path)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS archive ('
+                '    person TEXT NOT NULL,'
+                '    year INTEGER NOT NULL,'
+                '    month INTEGER NOT NULL,'
+                '    path TEXT NOT NULL,'
+                '    PRIMARY KEY (person, year, month)'
+                ')'
+            )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS imports ('
+                '    person TEXT PRIMARY KEY'
+                ')'
+            )
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def add(self, person: str, month: int, year: int, path: str) -> None:
+        """
+        Adds the archive file at `path` to the index under the given key.
+
+        :returns: None
+        """
+        # The paths are stored relative to the archive folder, so that the folder can be moved as a whole
+        path = os.path.relpath(os.path.abspath(path), os.path.abspath(self.archive_path))
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO archive (person, year, month, path) VALUES (?, ?, ?, ?)',
+                (str(person), int(year), int(month), path)
+            )
+
+    def get_path(self, person: str, month: int, year: int) -> Optional[str]:
+        """
+        Returns the path of the archive file for the given key or None if it is not part of the index.
+        """
+        row = self.connection.execute(
+            'SELECT path FROM archive WHERE person = ? AND year = ? AND month = ?',
+            (str(person), int(year), int(month))
+        ).fetchone()
+        return os.path.join(self.archive_path, row[0]) if row else None
+
+    def get(self, person: str, month: int, year: int) -> Optional[ArbeitszeitData]:
+        """
+        Returns the archived data for the given key or None if it does not exist.
+        """
+        path = self.get_path(person, month, year)
+        if path is None or not os.path.exists(path):
+            return None
+
+        return load_archive_file(path)
+
+    def write(self, person: str, azd_data: ArbeitszeitData, folder: str = '') -> str:
+        """
+        Writes the given `azd_data` as a new JSON file into the sub `folder` of the archive and adds it to the
+        index for the given `person`.
+
+        :returns: The path of the written file
+        """
+        folder_path = os.path.join(self.archive_path, folder)
+        if not os.path.exists(folder_path):
+            os.makedirs(folder_path)
+
+        path = os.path.join(folder_path, archive_file_name(azd_data.month, azd_data.year))
+        atomic_write(path, json.dumps(azd_data.to_dict(), indent=4))
+        self.add(person, azd_data.month, azd_data.year, path)
+
+        return path
+
+    def is_imported(self, person: str) -> bool:
+        row = self.connection.execute('SELECT 1 FROM imports WHERE person = ?', (str(person), )).fetchone()
+        return row is not None
+
+    def import_folder(self, person: str, folder: str = '') -> int:
+        """
+        Adds all the "{year}_{month}.json" archive files in the sub `folder` of the archive to the index for
+        the given `person`. The keys are taken from the file names, so none of the files has to be opened.
+
+        :returns: The number of files that were added to the index
+        """
+        archive = ArchiveFolder(os.path.join(self.archive_path, folder))
+        for (month, year), path in archive.paths.items():
+            self.add(person, month, year, path)
+
+        with self.connection:
+            self.connection.execute('INSERT OR IGNORE INTO imports (person) VALUES (?)', (str(person), ))
+
+        return len(archive)
@@ -0,0 +1,218 @@
+import asyncio
+import datetime
+from typing import List, Optional, Union, Iterable
+
+# httpx is an optional dependency, which is only needed for the asyncio client. It can be installed with the
+# "async" extra of this package.
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from harvest_kit_hiwi.harvest import time_entry_params
+from harvest_kit_hiwi.harvest import compile_fields
+from harvest_kit_hiwi.harvest import project_fields
+from harvest_kit_hiwi.transport import AsyncRateLimiter
+from harvest_kit_hiwi.transport import decode_json
+from harvest_kit_hiwi.transport import ACCEPT_ENCODING
+from harvest_kit_hiwi.transport import RETRY_STATUS_CODES
+from harvest_kit_hiwi.transport import DEFAULT_RETRIES
+from harvest_kit_hiwi.transport import DEFAULT_BACKOFF
+from harvest_kit_hiwi.transport import get_retry_delay
+
+DEFAULT_CONCURRENCY = 4
+
+
+class AsyncHarvestApi:
+    """
+    An asyncio client for the Harvest REST API v2 with the same interface as ``HarvestApi``, except that all
+    the methods are coroutines.
+
+    Paginated resources are retrieved by requesting the first page on its own to find out the total number
+    of pages and then all the remaining pages concurrently. The results are still returned in the original
+    order. At most `concurrency` requests of this client are in flight at the same time.
+
+    To fetch the data of many accounts from the same event loop, all clients should share the same `client`,
+    and therefore the same connection pool, as well as the same `semaphore`, which then bounds the number of
+    concurrent requests across all of them. Clients with the same access token should additionally share
+    the same `rate_limiter`, since the Harvest request budget applies per token.
+
+    Just like with the ``HarvestApi``, requests which fail temporarily are retried up to `retries` times.
+    The semaphore is only created once the first request is made, so that it belongs to the running event
+    loop even if the client itself was created outside of it.
+
+    .. code-block:: python
+
+        async with httpx.AsyncClient() as client:
+            semaphore = asyncio.Semaphore(8)
+            apis = [AsyncHarvestApi(url, account_id, token, client=client, semaphore=semaphore)
+                    for account_id, token in accounts]
+            results = await asyncio.gather(*[api.get_time_entries(project_id) for api in apis])
+
+    """
+    def __init__(self,
+                 url: str,
+                 account_id: str,
+                 account_token: str,
+                 client: Optional['httpx.AsyncClient'] = None,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 semaphore: Optional[asyncio.Semaphore] = None,
+                 rate_limiter: Optional[AsyncRateLimiter] = None,
+                 retries: int = DEFAULT_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF):
+        if httpx is None:
+            raise ImportError('The AsyncHarvestApi requires httpx, which can be installed with the "async" '
+                              'extra of this package')
+
+        self.url = url
+        self.account_id = account_id
+        self.account_token = account_token
+        self.concurrency = concurrency
+        self._semaphore = semaphore
+        self.rate_limiter = rate_limiter if rate_limiter is not None else AsyncRateLimiter()
+        self.retries = retries
+        self.backoff = backoff
+
+        # ~ computed properties
+        self.time_entries_url = self.url + 'time_entries'
+        self.projects_url = self.url + 'projects'
+        self.users_url = self.url + 'users'
+
+        # The headers are sent with every request instead of being set on the client, because the client
+        # may be shared with other accounts.
+        self.headers = {
+            'Authorization': f'Bearer {self.account_token}',
+            'Harvest-Account-Id': f'{self.account_id}',
+            'User-Agent': 'Kit Hiwi',
+            'Accept-Encoding': ACCEPT_ENCODING,
+        }
+
+        # ~ setting up the connection pool
+        # A client that was passed in belongs to the caller, who is responsible for closing it.
+        self.owns_client = client is None
+        if client is None:
+            client = httpx.AsyncClient(limits=httpx.Limits(max_connections=self.concurrency))
+        self.client = client
+
+    async def close(self) -> None:
+        if self.owns_client:
+            await self.client.aclose()
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # On older python versions, a semaphore is bound to the event loop that is current when it is created
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        return self._semaphore
+
+    async def request(self, url: str, params: Optional[dict] = None) -> 'httpx.Response':
+        """
+        Sends a GET request to `url` with the query `params`, respecting the concurrency and rate limits.
+        Temporary failures are retried, see ``HarvestApi.request``.
+
+        :returns: The response of the last attempt
+        """
+        attempt = 0
+        while True:
+            async with self.semaphore:
+                await self.rate_limiter.acquire()
+                try:
+                    response = await self.client.get(url, params=params, headers=self.headers)
+                except httpx.TransportError:
+                    if attempt >= self.retries:
+                        raise
+                    response = None
+                else:
+                    if response.status_code not in RETRY_STATUS_CODES or attempt >= self.retries:
+                        return response
+
+            # The delay is waited outside of the semaphore, so that it does not hold up any other requests
+            await asyncio.sleep(get_retry_delay(response, attempt, self.backoff))
+            attempt += 1
+
+    async def get_page(self,
+                       url: str,
+                       params: dict,
+                       page: int,
+                       key: Optional[str] = None,
+                       fields: Optional[Iterable[str]] = None) -> dict:
+        """
+        Requests the single page number `page` of the paginated resource at `url` with the additional query
+        `params`. See ``HarvestApi.get_page`` for `key` and `fields`.
+
+        :returns: The decoded JSON response
+        """
+        response = await self.request(url, params={**params, 'page': page})
+        response.raise_for_status()
+        data = decode_json(response.content)
+        if key is not None and fields is not None:
+            tree = compile_fields(fields)
+            data[key] = [project_fields(item, tree) for item in data[key]]
+
+        return data
+
+    async def get_paginated(self,
+                            url: str,
+                            key: str,
+                            params: dict,
+                            fields: Optional[Iterable[str]] = None) -> List[dict]:
+        """
+        Retrieves all pages of the paginated resource at `url` with the given query `params`. `key` is the
+        name of the field of the response which contains the actual list of items. If `fields` are given,
+        the items are reduced to only these fields.
+
+        :returns: The concatenated list of the items from all pages
+        """
+        data = await self.get_page(url, params, 1, key, fields)
+        items = list(data[key])
+
+        if data.get('total_pages'):
+            pages = range(2, data['total_pages'] + 1)
+            # "gather" returns the results in the order of the pages, regardless of which request finishes
+            # first.
+            for page_data in await asyncio.gather(*[self.get_page(url, params, page, key, fields)
+                                                    for page in pages]):
+                items += page_data[key]
+
+        else:
+            next_page = data['next_page']
+            while next_page is not None:
+                data = await self.get_page(url, params, next_page, key, fields)
+                items += data[key]
+                next_page = data['next_page']
+
+        return items
+
+    async def get_projects(self) -> List[dict]:
+        return await self.get_paginated(self.projects_url, 'projects', {})
+
+    async def get_user(self, user_id: str) -> dict:
+        response = await self.request(f'{self.users_url}/{user_id}')
+        response.raise_for_status()
+        return decode_json(response.content)
+
+    async def get_time_entries(self,
+                               project_id: str,
+                               from_date: Optional[Union[datetime.date, str]] = None,
+                               to_date: Optional[Union[datetime.date, str]] = None,
+                               updated_since: Optional[Union[datetime.datetime, str]] = None,
+                               user_id: Optional[str] = None,
+                               fields: Optional[Iterable[str]] = None,
+                               ) -> List[dict]:
+        """
+        Retrieves all the time entries of the project with the given `project_id`. See
+        ``HarvestApi.iter_time_entries`` for the meaning of the optional arguments.
+
+        :returns: A list of the raw time entry dicts
+        """
+        params = time_entry_params(project_id, from_date, to_date, updated_since, user_id)
+        return await self.get_paginated(self.time_entries_url, 'time_entries', params, fields)
+
+    # -- MAGIC METHODS --
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
@@ -0,0 +1,178 @@
+import os
+import shutil
+import hashlib
+import tempfile
+from typing import Optional
+
+from harvest_kit_hiwi.util import create_temp_file
+
+# 100 MB
+DEFAULT_CACHE_SIZE = 100 * 1024 * 1024
+
+
+def hash_key(*parts: str) -> str:
+    """
+    Creates a hex digest which can be used as a cache key from the given string `parts`.
+    """
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(str(part).encode())
+        hasher.update(b'\0')
+
+    return hasher.hexdigest()
+
+
+class DiskCache:
+    """
+    A simple size-bounded key value store for binary content, which is persisted as individual files inside
+    the folder `path`.
+
+    The modification time of each file doubles as the time of the last access, which is used to implement a
+    least-recently-used eviction policy: As soon as the total size of all files exceeds `max_size` bytes, the
+    least recently used files are removed until the cache fits again.
+
+    .. code-block:: python
+
+        cache = DiskCache('/tmp/cache', max_size=1024 * 1024)
+        cache.put('key', b'content')
+        content = cache.get('key')
+
+    """
+    def __init__(self,
+                 path: str,
+                 max_size: int = DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.max_size = max_size
+
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+
+        self.size = sum(os.path.getsize(file_path) for file_path in self.file_paths())
+
+    def file_paths(self):
+        for file in os.listdir(self.path):
+            if not file.startswith('.'):
+                yield os.path.join(self.path, file)
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.path, hash_key(key))
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Returns the content which was stored for the given `key` or None if the cache does not contain it.
+        """
+        file_path = self.get_path(key)
+        try:
+            with open(file_path, mode='rb') as file:
+                content = file.read()
+            os.utime(file_path)
+            return content
+
+        except FileNotFoundError:
+            return None
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self.get_path(key))
+
+    def put(self, key: str, content: bytes) -> None:
+        """
+        Stores the given `content` for the given `key`, replacing any previous content. If this exceeds the
+        size limit of the cache, the least recently used entries are evicted.
+
+        :returns: None
+        """
+        file_path = self.get_path(key)
+        previous_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+
+        # The content is first written to a temporary file which is then moved into place, so that concurrent
+        # readers never see a partially written file.
+        fd, temp_path = tempfile.mkstemp(dir=self.path, prefix='.')
+        with os.fdopen(fd, mode='wb') as file:
+            file.write(content)
+        os.replace(temp_path, file_path)
+
+        self.size += len(content) - previous_size
+        if self.size > self.max_size:
+            self.evict()
+
+    def copy_to(self, key: str, path: str, link: bool = False) -> bool:
+        """
+        Writes the content which was stored for the given `key` to the file `path` without reading it into
+        memory as a whole. The copy gets the same permissions as a file created with a regular "open".
+
+        If `link` is True, the file is hard linked instead of copied where possible. This must only be used if
+        the file at `path` is never modified in place, for example by a viewer saving annotations, since that
+        would modify the cache entry as well. Replacing the file as a whole is fine.
+
+        :returns: True if the content was written and False if the cache does not contain the key
+        """
+        file_path = self.get_path(key)
+        try:
+            os.utime(file_path)
+            source = open(file_path, mode='rb')
+        # The entry might also have been evicted by another process in the meantime
+        except FileNotFoundError:
+            return False
+
+        with source:
+            fd, temp_path = create_temp_file(os.path.dirname(os.path.abspath(path)))
+            try:
+                if link:
+                    try:
+                        os.link(file_path, temp_path + '.link')
+                        os.replace(temp_path + '.link', path)
+                        return True
+                    except OSError:
+                        # The cache might be on a different file system or the file system does not support
+                        # hard links at all. The entry can also have been evicted since it was opened.
+                        pass
+
+                with os.fdopen(fd, mode='wb') as target:
+                    fd = None
+                    shutil.copyfileobj(source, target)
+                os.replace(temp_path, path)
+                return True
+
+            finally:
+                if fd is not None:
+                    os.close(fd)
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+    def remove(self, key: str) -> None:
+        file_path = self.get_path(key)
+        if os.path.exists(file_path):
+            self.size -= os.path.getsize(file_path)
+            os.remove(file_path)
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used entries until the total size is within the size limit again.
+
+        :returns: None
+        """
+        # Other processes can share the same cache folder and might have evicted some of the files already
+        entries = []
+        for file_path in self.file_paths():
+            try:
+                entries.append((os.path.getmtime(file_path), os.path.getsize(file_path), file_path))
+            except FileNotFoundError:
+                continue
+
+        entries.sort()
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, file_path in entries:
+            if self.size <= self.max_size:
+                break
+
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
+
+    def clear(self) -> None:
+        for file_path in self.file_paths():
+            os.remove(file_path)
+
+        self.size = 0
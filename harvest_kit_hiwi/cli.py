@@ -1,24 +1,41 @@
 """Console script for harvest_kit_hiwi."""
+from __future__ import annotations
+
 import os
 import sys
 import click
-import json
 import datetime
-from collections import defaultdict
-from pprint import pprint
-
-import cairosvg
+from typing import List, Tuple, Optional, Dict, Iterable, Union, TYPE_CHECKING
 
 from harvest_kit_hiwi.util import get_version
 from harvest_kit_hiwi.util import MONTH_NAMES
+from harvest_kit_hiwi.util import month_date_range
+from harvest_kit_hiwi.util import previous_month
+from harvest_kit_hiwi.util import iter_months
 from harvest_kit_hiwi.config import CONFIG
-from harvest_kit_hiwi.harvest import HarvestApi
-from harvest_kit_hiwi.processing import TimeSpan, ArbeitszeitData
-from harvest_kit_hiwi.document import create_azd_svg
+from harvest_kit_hiwi.config import CACHE_PATH
+from harvest_kit_hiwi.config import ConfigData
+from harvest_kit_hiwi.config import load_roster
+from harvest_kit_hiwi.cache import DiskCache
+from harvest_kit_hiwi.timing import Timings
+from harvest_kit_hiwi.timing import stage
+from harvest_kit_hiwi.timing import profiled
+
+# The modules for the communication with Harvest and especially for the rendering pull in large libraries
+# (requests, lxml, cairo), which would make every invocation of the command line slow, even just showing the
+# help text. That is why they are only imported within the functions that actually need them.
+if TYPE_CHECKING:
+    from harvest_kit_hiwi.harvest import HarvestApi
+    from harvest_kit_hiwi.transport import RateLimiter
+    from harvest_kit_hiwi.processing import TimeSpan, ArbeitszeitData
+    from harvest_kit_hiwi.document import AzdTemplate, AzdStringTemplate, RenderJob
 
 
 CHECK_MARK = '✓'
 
+# The keys of harvest_kit_hiwi.document.ENGINES, which can not be imported here without loading svgutils
+ENGINE_NAMES = ['svgutils', 'string']
+
 
 def echo_info(content: str, verbose: bool = True):
     if verbose:
@@ -30,9 +47,276 @@ def echo_success(content: str, verbose: bool = True):
         click.secho(f'[{CHECK_MARK}] {content}')
 
 
+# == PIPELINE ==
+# The following functions implement the individual stages of creating a document. They are shared by the
+# different commands, which only differ in how they combine them.
+
+def create_api(config: ConfigData,
+               workers: int = 1,
+               http_cache: bool = False,
+               http_cache_ttl: float = 0,
+               rate_limiter: Optional[RateLimiter] = None,
+               timings: Optional[Timings] = None) -> HarvestApi:
+    from harvest_kit_hiwi.harvest import HarvestApi
+
+    return HarvestApi(
+        url=config.get_harvest_url(),
+        account_id=config.get_harvest_id(),
+        account_token=config.get_harvest_token(),
+        workers=workers,
+        rate_limiter=rate_limiter,
+        cache=DiskCache(os.path.join(CACHE_PATH, 'http')) if http_cache else None,
+        cache_ttl=http_cache_ttl,
+        timings=timings,
+    )
+
+
+def retrieve_time_entries(api: HarvestApi,
+                          config: ConfigData,
+                          from_date: datetime.date,
+                          to_date: datetime.date,
+                          archive_path: str,
+                          cache: bool = False,
+                          offline: bool = False,
+                          resync: bool = False) -> Iterable[dict]:
+    from harvest_kit_hiwi.store import TimeEntryStore
+    from harvest_kit_hiwi.harvest import TIME_ENTRY_FIELDS
+
+    project_id = config.get_harvest_project_id()
+    user_id = config.get_harvest_user_id()
+
+    # The time spans are assigned to a month by the creation time of the entries and not by their
+    # "spent_date", which may well lie in a different month (e.g. an entry for Oct 31 that was only created
+    # on Nov 1). That is why the entries are selected by their creation time as well.
+    # Optionally, the time entries are kept in a local store inside the archive folder. In that case
+    # only the entries that have changed since the last run need to be retrieved from harvest.
+    if cache or offline or resync:
+        store = TimeEntryStore.from_archive(archive_path)
+        if not offline:
+            num_updated = store.sync(api, project_id, full=resync, user_id=user_id)
+            click.secho(f'synced {num_updated} updated time entries from harvest')
+
+        time_entries = store.get_time_entries(project_id, from_date, to_date, by='created_at')
+        store.close()
+        click.secho(f'loaded {len(time_entries)} time entries from the local cache')
+
+    else:
+        # The API can not filter by the creation time directly. But an entry created at the start of the
+        # window or later has necessarily also been updated since then, so "updated_since" returns all of
+        # them. The window is open ended though: `to_date` is only applied by the local store above. Here,
+        # all the entries created or changed after the window are returned as well and have to be skipped
+        # by the caller.
+        # Of every entry, only the few fields needed to create the time spans are kept
+        time_entries = api.iter_time_entries(
+            project_id=project_id,
+            updated_since=datetime.datetime.combine(from_date, datetime.time(), datetime.timezone.utc),
+            user_id=user_id,
+            fields=TIME_ENTRY_FIELDS,
+        )
+
+    return time_entries
+
+
+def retrieve_time_spans(api: HarvestApi,
+                        config: ConfigData,
+                        month: str,
+                        year: str,
+                        archive_path: str,
+                        cache: bool = False,
+                        offline: bool = False,
+                        resync: bool = False) -> List[TimeSpan]:
+    from harvest_kit_hiwi.processing import iter_time_spans
+
+    # The time entries are requested from the API starting at the first day of the selected month. This
+    # window has no end, however: every entry that was created or changed since then is returned as well.
+    # For a recent month that is only a few pages, but for a month far in the past, most of the history of
+    # the project since then has to be paginated through only to discard it. The local store ("--cache")
+    # avoids this, because it filters by both ends of the window.
+    from_date, to_date = month_date_range(month, year)
+    time_entries = retrieve_time_entries(api, config, from_date, to_date, archive_path,
+                                         cache=cache, offline=offline, resync=resync)
+
+    # The raw time entries are converted into TimeSpan objects, which we can perform processing on more
+    # easily. This also filters all those entries to only have the ones created in the selected month, since
+    # the window of the API request is open ended.
+    # If the entries come directly from the API, this consumes them page by page as they arrive.
+    time_spans = list(iter_time_spans(time_entries, month=month, year=year))
+    click.secho(f'retrieved {len(time_spans)} time spans for {month}/{year}')
+
+    return time_spans
+
+
+def load_previous_azd(archive_path: str,
+                      person: str,
+                      month: str,
+                      year: str,
+                      folder: str = '') -> Optional[ArbeitszeitData]:
+    from harvest_kit_hiwi.archive import ArchiveIndex
+
+    if not os.path.isdir(archive_path):
+        click.secho(f'archive not found')
+        return None
+
+    # The archive is accessed through an index, so that the previous month can be looked up directly. An
+    # archive which was created before the index existed is imported automatically the first time.
+    index = ArchiveIndex(archive_path)
+    if not index.is_imported(person):
+        num_imported = index.import_folder(person, folder)
+        click.secho(f'indexed {num_imported} existing archive entries')
+
+    prev_month, prev_year = previous_month(month, year)
+    azd_prev = index.get(person, prev_month, prev_year)
+    index.close()
+    if azd_prev is not None:
+        click.secho(f'found archive entry for {prev_month}/{prev_year}')
+
+    return azd_prev
+
+
+def process_time_spans(config: ConfigData,
+                       time_spans: List[TimeSpan]) -> Tuple[List[TimeSpan], float]:
+    from harvest_kit_hiwi.processing import merge_daily, clip_time_spans
+
+    leave = 0
+
+    # (1) This first additional processing step optionally merges all time spans that are recorded on the
+    # same day into a single one.
+    if config.do_merge_daily():
+        time_spans = merge_daily(time_spans, granularity=config.get_merge_granularity())
+
+    # (2) Another optional processing step is the automatic adding of leave time. There is a certain amount
+    # of monthly leave that every hiwi has available and which SHOULD be used up completely. One good way
+    # to do this is just to "pretend" to use the exactly right amount every month
+    if config.do_monthly_leave():
+        leave = config.get_monthly_leave()
+
+    # (3) Another problem is the handling of the carry over between months. It's really easy to lose track
+    # which is why it's possible to clip all the overtime of a month and artificially make it such that
+    # it fits perfectly
+    time_spans, carry_over = clip_time_spans(
+        time_spans,
+        working_hours=config.get_working_hours(),
+        leave=leave,
+        clip=config.do_clip_hours(),
+    )
+    echo_info(f'overtime this month: {carry_over.overtime_seconds / 3600:.1f} hrs')
+    click.secho(f'calculated carry over of {carry_over.carry_over_seconds:.2f} seconds '
+                f'({carry_over.carry_over_seconds / 3600:.2f} hrs)')
+
+    # Finally, we need to order this list by the starting time to list the time spans in chronological
+    # order in the final document
+    time_spans = sorted(time_spans, key=lambda ts: ts.start_datetime)
+
+    return time_spans, leave
+
+
+def create_azd_data(config: ConfigData,
+                    time_spans: List[TimeSpan],
+                    leave: float,
+                    month: str,
+                    year: str,
+                    azd_prev: Optional[ArbeitszeitData]) -> ArbeitszeitData:
+    from harvest_kit_hiwi.processing import ArbeitszeitData
+
+    # To render the document we first need to wrap all the relevant data into a "AbeitszeitData" object.
+    # This will wrap the static personal information as well as the list of time spans.
+    carry_over = 0
+    if azd_prev is not None:
+        carry_over = azd_prev.carry_over_after
+
+    return ArbeitszeitData(
+        time_spans=time_spans,
+        name=config.get_name(),
+        personnel_number=config.get_personnel_number(),
+        institute=config.get_institute(),
+        working_hours=config.get_working_hours(),
+        hourly_rate=config.get_hourly_rate(),
+        carry_over=carry_over,
+        leave=leave,
+        month=month,
+        year=year,
+    )
+
+
+def create_render_caches(overlay: bool = False) -> Tuple[Optional[DiskCache], DiskCache]:
+    """
+    Creates the disk caches used for rendering. They are created once per command and then shared by all
+    the render jobs of that command.
+
+    :returns: A tuple (pdf_cache, output_cache), where the cache for the background PDF of the template is
+        only created in the `overlay` mode
+    """
+    pdf_cache = DiskCache(os.path.join(CACHE_PATH, 'pdf')) if overlay else None
+    return pdf_cache, DiskCache(os.path.join(CACHE_PATH, 'output'))
+
+
+def create_render_job(azd_data: ArbeitszeitData,
+                      output_path: str,
+                      name: str,
+                      svg: bool = True,
+                      overlay: bool = False,
+                      engine: str = 'svgutils',
+                      force: bool = False,
+                      pdf_cache: Optional[DiskCache] = None,
+                      output_cache: Optional[DiskCache] = None) -> RenderJob:
+    from harvest_kit_hiwi.document import RenderJob
+
+    # By default, we will output the raw svg file as well as the pdf. This is so that the user can
+    # potentially make manual adjustments on the svg file and then render it as pdf afterwards manually.
+    # Documents whose data did not change since they were last rendered are taken from the output cache.
+    return RenderJob(
+        azd_data=azd_data,
+        svg_path=os.path.join(output_path, f'{name}.svg') if svg else None,
+        pdf_path=os.path.join(output_path, f'{name}.pdf'),
+        overlay=overlay,
+        cache=pdf_cache,
+        engine=engine,
+        output_cache=output_cache,
+        force=force,
+    )
+
+
+def render_azd(azd_data: ArbeitszeitData,
+               output_path: str,
+               name: str,
+               svg: bool = True,
+               overlay: bool = False,
+               template: Union[AzdTemplate, AzdStringTemplate, None] = None,
+               timings: Optional[Timings] = None,
+               engine: str = 'svgutils',
+               force: bool = False,
+               pdf_cache: Optional[DiskCache] = None,
+               output_cache: Optional[DiskCache] = None) -> str:
+    from harvest_kit_hiwi.document import render_job
+
+    job = create_render_job(azd_data, output_path, name, svg=svg, overlay=overlay, engine=engine, force=force,
+                            pdf_cache=pdf_cache, output_cache=output_cache)
+    pdf_path = render_job(job, template=template, timings=timings)
+    click.secho(f'wrote output pdf: "{pdf_path}"')
+
+    return pdf_path
+
+
+def archive_azd(azd_data: ArbeitszeitData,
+                archive_path: str,
+                person: str,
+                folder: str = '') -> str:
+    from harvest_kit_hiwi.archive import ArchiveIndex
+
+    index = ArchiveIndex(archive_path)
+    json_path = index.write(person, azd_data, folder)
+    index.close()
+    click.secho(f'wrote archive: "{json_path}"')
+
+    return json_path
+
+
+# == COMMANDS ==
+
 @click.group('hhiwi', invoke_without_command=True)
-@click.option('--version')
-def cli(version):
+@click.option('--version', is_flag=True,
+              help='Print the version of this package and exit')
+def cli(version: bool):
 
     if version:
         click.secho(get_version())
@@ -47,153 +331,359 @@ def cli(version):
               help='The path to the folder that contains the archive of past Arbeitszeit data')
 @click.option('-n', '--non-archival', is_flag=True,
               help='Do not save the created AZD data to the archive')
+@click.option('-w', '--workers', type=click.INT, default=1,
+              help='The number of pages of time entries to retrieve from Harvest concurrently')
+@click.option('-c', '--cache', is_flag=True,
+              help='Keep a local copy of the time entries in the archive and only retrieve the changes')
+@click.option('--offline', is_flag=True,
+              help='Only use the time entries from the local cache without contacting Harvest')
+@click.option('--resync', is_flag=True,
+              help='Retrieve all time entries into the local cache to also detect deleted entries')
+@click.option('--http-cache', is_flag=True,
+              help='Cache the Harvest responses and revalidate them with conditional requests')
+@click.option('--http-cache-ttl', type=click.FLOAT, default=0,
+              help='The number of seconds for which cached Harvest responses are used without revalidation')
+@click.option('--no-svg', is_flag=True,
+              help='Only create the PDF document without additionally writing the SVG file')
+@click.option('--overlay', is_flag=True,
+              help='Only render the text and merge it onto a cached PDF of the blank template (needs pypdf)')
+@click.option('--engine', type=click.Choice(ENGINE_NAMES), default='svgutils',
+              help='How the SVG is created: "svgutils" builds an element tree, "string" joins the raw text')
+@click.option('--force', is_flag=True,
+              help='Render the documents even if they are unchanged since they were last rendered')
+@click.option('--timings', 'show_timings', is_flag=True,
+              help='Print the wall time of every stage and the number of HTTP requests and entries at the end')
+@click.option('--profile', type=click.Path(dir_okay=False), default=None,
+              help='Profile the whole run with cProfile and write the statistics to the given file')
 def azd(month: str,
         year: int,
         archive_path: str,
-        non_archival: bool):
+        non_archival: bool,
+        workers: int,
+        cache: bool,
+        offline: bool,
+        resync: bool,
+        http_cache: bool,
+        http_cache_ttl: float,
+        no_svg: bool,
+        overlay: bool,
+        engine: str,
+        force: bool,
+        show_timings: bool,
+        profile: Optional[str]):
     click.secho('Generating "KIT Arbeitszeitdokumentation" from Harvest Time Tracking...')
     year = str(year)
+    timings = Timings()
+
+    with profiled(profile):
+        # -- RETRIEVAL --
+        # First thing we need to do is establish a connection to Harvest to retrieve the raw data.
+        try:
+            with stage(timings, 'retrieval'):
+                api = create_api(CONFIG, workers=workers, http_cache=http_cache, http_cache_ttl=http_cache_ttl,
+                                 timings=timings)
+                time_spans = retrieve_time_spans(
+                    api=api,
+                    config=CONFIG,
+                    month=month,
+                    year=year,
+                    archive_path=archive_path,
+                    cache=cache,
+                    offline=offline,
+                    resync=resync,
+                )
+            timings.count('time_spans', len(time_spans))
+
+        except Exception as e:
+            click.secho(str(e), fg='red')
+            return 1
+
+        # -- ARCHIVE --
+        with stage(timings, 'archive'):
+            person = CONFIG.get_key()
+            azd_prev = load_previous_azd(archive_path, person, month, year)
+
+        # -- PROCESSING --
+        with stage(timings, 'processing'):
+            time_spans, leave = process_time_spans(CONFIG, time_spans)
+
+        # -- RENDERING --
+        with stage(timings, 'rendering'):
+            azd_data = create_azd_data(CONFIG, time_spans, leave, month, year, azd_prev)
+            pdf_cache, output_cache = create_render_caches(overlay)
+            render_azd(azd_data, os.getcwd(), f'azd_{month}_{year}', svg=not no_svg, overlay=overlay,
+                       timings=timings, engine=engine, force=force, pdf_cache=pdf_cache,
+                       output_cache=output_cache)
+
+        if not non_archival:
+            with stage(timings, 'archiving'):
+                archive_azd(azd_data, archive_path, person)
+
+    if profile is not None:
+        click.secho(f'wrote profile: "{profile}"')
+
+    if show_timings:
+        click.secho('timings:')
+        for line in timings.report().split('\n'):
+            echo_info(line)
+
+
+@click.command('azd-range', short_help='Creates the PDF documents for a range of months at once')
+@click.argument('from_month', type=click.Choice([str(k) for k in MONTH_NAMES.keys()]))
+@click.argument('to_month', type=click.Choice([str(k) for k in MONTH_NAMES.keys()]))
+@click.option('--year', type=click.INT, default=datetime.datetime.now().year,
+              help='The year of the first month of the range')
+@click.option('--to-year', type=click.INT, default=None,
+              help='The year of the last month of the range. Defaults to the year of the first month')
+@click.option('-a', '--archive-path', type=click.Path(), default='./azd_archive',
+              help='The path to the folder that contains the archive of past Arbeitszeit data')
+@click.option('-n', '--non-archival', is_flag=True,
+              help='Do not save the created AZD data to the archive')
+@click.option('-w', '--workers', type=click.INT, default=1,
+              help='The number of pages of time entries to retrieve from Harvest concurrently')
+@click.option('-c', '--cache', is_flag=True,
+              help='Keep a local copy of the time entries in the archive and only retrieve the changes')
+@click.option('--offline', is_flag=True,
+              help='Only use the time entries from the local cache without contacting Harvest')
+@click.option('--http-cache', is_flag=True,
+              help='Cache the Harvest responses and revalidate them with conditional requests')
+@click.option('--no-svg', is_flag=True,
+              help='Only create the PDF document without additionally writing the SVG file')
+@click.option('--overlay', is_flag=True,
+              help='Only render the text and merge it onto a cached PDF of the blank template (needs pypdf)')
+@click.option('--engine', type=click.Choice(ENGINE_NAMES), default='svgutils',
+              help='How the SVG is created: "svgutils" builds an element tree, "string" joins the raw text')
+@click.option('--force', is_flag=True,
+              help='Render the documents even if they are unchanged since they were last rendered')
+def azd_range(from_month: str,
+              to_month: str,
+              year: int,
+              to_year: Optional[int],
+              archive_path: str,
+              non_archival: bool,
+              workers: int,
+              cache: bool,
+              offline: bool,
+              http_cache: bool,
+              no_svg: bool,
+              overlay: bool,
+              engine: str,
+              force: bool):
+    """
+    Creates the documents for all the months from FROM_MONTH to TO_MONTH (both inclusive). The time entries of
+    the whole range are retrieved from Harvest only once and the carry over is passed on from one month to
+    the next directly, so that for example the documents of a whole year can be created in a single run.
+    """
+    from harvest_kit_hiwi.document import ENGINES
+    from harvest_kit_hiwi.processing import TimeSpan, partition_by_month
+
+    to_year = to_year if to_year is not None else year
+    months = list(iter_months(from_month, year, to_month, to_year))
+    if not months:
+        click.secho(f'the range {from_month}/{year} - {to_month}/{to_year} does not contain any months', fg='red')
+        sys.exit(1)
+
+    click.secho(f'Generating "KIT Arbeitszeitdokumentation" for {len(months)} months...')
 
     # -- RETRIEVAL --
-    # First thing we need to do is establish a connection to Harvest to retrieve the raw data.
+    # The time entries of the whole range are retrieved at once and then partitioned by month in one pass.
+    # Both the retrieval and the partitions are based on the creation time of the entries, so that every
+    # entry ends up in exactly one month. Entries created after the range form partitions of their own,
+    # which are simply not rendered.
     try:
-        api = HarvestApi(
-            url=CONFIG.get_harvest_url(),
-            account_id=CONFIG.get_harvest_id(),
-            account_token=CONFIG.get_harvest_token()
-        )
-        time_entries = api.get_time_entries(
-            project_id=CONFIG.get_harvest_project_id()
-        )
-        click.secho(f'retrieved {len(time_entries)} time entries from harvest')
+        api = create_api(CONFIG, workers=workers, http_cache=http_cache)
+        from_date, _ = month_date_range(*months[0])
+        _, to_date = month_date_range(*months[-1])
+        time_entries = retrieve_time_entries(api, CONFIG, from_date, to_date, archive_path,
+                                             cache=cache, offline=offline)
+        partitions = partition_by_month(TimeSpan.from_time_entries(time_entries))
 
     except Exception as e:
         click.secho(str(e), fg='red')
-        return 1
+        sys.exit(1)
 
     # -- ARCHIVE --
-    archive = {}
-    dt = datetime.datetime(month=int(month), year=int(year), day=10)
-    dt_prev = dt - datetime.timedelta(days=30)
-    prev_key = (dt_prev.month, dt_prev.year)
-    if os.path.exists(archive_path) and os.path.isdir(archive_path):
-        files = os.listdir(archive_path)
-        click.secho(f'discovered archive with {len(files)} entries')
-
-        for file in files:
-            file_path = os.path.join(archive_path, file)
-            if file.endswith('.json'):
-                with open(file_path, mode='r') as file:
-                    data = json.load(file)
-                    azd_data = ArbeitszeitData.from_dict(data)
-                    archive[(azd_data.month, azd_data.year)] = azd_data
+    # Only the month before the range is taken from the archive, all the following ones are created here.
+    person = CONFIG.get_key()
+    azd_prev = load_previous_azd(archive_path, person, *months[0])
 
-    else:
-        click.secho(f'archive not found')
+    # All the documents are rendered in this process with the same parsed template
+    template = ENGINES[engine].load()
+    pdf_cache, output_cache = create_render_caches(overlay)
+    for month, year in months:
+        click.secho(f'\n{MONTH_NAMES[month]} {year}', bold=True)
+        month, year = str(month), str(year)
+        time_spans = partitions.get((int(month), int(year)), [])
+        click.secho(f'retrieved {len(time_spans)} time spans for {month}/{year}')
 
-    # -- PROCESSING --
-    # Then we need to process these raw time entries into TimeSpan objects, which we can perform processing
-    # on more easily
-    time_spans = [TimeSpan.from_time_entry(time_entry) for time_entry in time_entries]
-    total_time_delta = datetime.timedelta(hours=0)
-    leave = 0
+        time_spans, leave = process_time_spans(CONFIG, time_spans)
+        azd_data = create_azd_data(CONFIG, time_spans, leave, month, year, azd_prev)
+        render_azd(azd_data, os.getcwd(), f'azd_{month}_{year}', svg=not no_svg, overlay=overlay,
+                   template=template, engine=engine, force=force, pdf_cache=pdf_cache,
+                   output_cache=output_cache)
 
-    # (1) The first thing we have to do is filter all those entries to only have the ones for the selected
-    # month
-    time_spans = [ts for ts in time_spans if str(ts.start_datetime.month) == month]
+        if not non_archival:
+            archive_azd(azd_data, archive_path, person)
 
-    # (2) This first additional processing step optionally merges all time spans that are recorded on the
-    # same day into a single one.
-    if CONFIG.do_merge_daily():
-        day_map = defaultdict(list)
-        for ts in time_spans:
-            day = ts.start_datetime.day
-            day_map[day].append(ts)
-
-        # And then we simply merge all the dicts
-        time_spans = [sum(time_spans_sorted[1:], time_spans_sorted[0])
-                      for time_spans in day_map.values()
-                      if (time_spans_sorted := sorted(time_spans, key=lambda ts: ts.start_datetime))]
-
-    # (3) Another optional processing step is the automatic adding of leave time. There is a certain amount
-    # of monthly leave that every hiwi has available and which SHOULD be used up completely. One good way
-    # to do this is just to "pretend" to use the exactly right amount every month
-    if CONFIG.do_monthly_leave():
-        leave = CONFIG.get_monthly_leave()
+        azd_prev = azd_data
 
-    # (4) Another problem is the handling of the carry over between months. It's really easy to lose track
-    # which is why it's possible to clip all the overtime of a month and artificially make it such that
-    # it fits perfectly
-    for ts in time_spans:
-        total_time_delta += ts.time_delta
 
-    total_working_seconds = int(CONFIG.get_working_hours() * 3600)
-    total_difference_seconds = total_time_delta.total_seconds() - (total_working_seconds - leave * 3600)
-    echo_info(f'overtime this month: {total_difference_seconds / 3600:.1f} hrs')
-    if CONFIG.do_clip_hours() and total_difference_seconds > 0:
+@click.command('batch', short_help='Creates the Arbeitszeitdokumentation PDFs for multiple people at once')
+@click.argument('roster', type=click.Path(exists=True, dir_okay=False))
+@click.argument('month', type=click.Choice([str(k) for k in MONTH_NAMES.keys()]))
+@click.option('--year', type=click.INT, default=datetime.datetime.now().year,
+              help='The year for which to render the monthly documentation')
+@click.option('-a', '--archive-path', type=click.Path(), default='./azd_archive',
+              help='The path to the folder that contains one archive sub folder per person')
+@click.option('-o', '--output-path', type=click.Path(file_okay=False), default='.',
+              help='The path to the folder into which the documents are written')
+@click.option('-n', '--non-archival', is_flag=True,
+              help='Do not save the created AZD data to the archive')
+@click.option('-w', '--workers', type=click.INT, default=1,
+              help='The number of pages of time entries to retrieve from Harvest concurrently')
+@click.option('--http-cache', is_flag=True,
+              help='Cache the Harvest responses and revalidate them with conditional requests')
+@click.option('-p', '--processes', type=click.INT, default=None,
+              help='The number of processes used to render the documents. Defaults to the number of CPUs')
+@click.option('--no-svg', is_flag=True,
+              help='Only create the PDF document without additionally writing the SVG file')
+@click.option('--overlay', is_flag=True,
+              help='Only render the text and merge it onto a cached PDF of the blank template (needs pypdf)')
+@click.option('--engine', type=click.Choice(ENGINE_NAMES), default='svgutils',
+              help='How the SVG is created: "svgutils" builds an element tree, "string" joins the raw text')
+@click.option('--force', is_flag=True,
+              help='Render the documents even if they are unchanged since they were last rendered')
+def batch(roster: str,
+          month: str,
+          year: int,
+          archive_path: str,
+          output_path: str,
+          non_archival: bool,
+          workers: int,
+          http_cache: bool,
+          processes: Optional[int],
+          no_svg: bool,
+          overlay: bool,
+          engine: str,
+          force: bool):
+    """
+    Creates the documents for all the people listed in the ROSTER file for the given MONTH. The roster is a
+    YAML file with a "people" list, where each element is either a config block which overrides the values of
+    the main config or just the harvest user id of a person.
+    """
+    from harvest_kit_hiwi.transport import TokenBucket
+    from harvest_kit_hiwi.document import render_azd_documents
+
+    click.secho('Generating "KIT Arbeitszeitdokumentation" for multiple people...')
+    year = str(year)
+    configs = load_roster(roster, CONFIG)
+    click.secho(f'loaded roster with {len(configs)} people')
+
+    if not os.path.exists(output_path):
+        os.makedirs(output_path)
+
+    # All the people share the same harvest api client, and therefore the same connection pool, as long as
+    # they use the same harvest account. People with the same access token additionally have to share the
+    # rate limit.
+    apis: Dict[tuple, HarvestApi] = {}
+    rate_limiters: Dict[str, RateLimiter] = {}
+
+    # -- RETRIEVAL & PROCESSING --
+    # The data of all the people is retrieved and processed first. The rendering, which is the most
+    # expensive part, can then be distributed across multiple processes for all the documents at once.
+    failures: List[Tuple[str, Exception]] = []
+    jobs: List[Tuple[str, RenderJob]] = []
+    pdf_cache, output_cache = create_render_caches(overlay)
+    for index, config in enumerate(configs):
+        key = config.get_key()
+        click.secho(f'\n({index + 1}/{len(configs)}) {key}', bold=True)
+        try:
+            api_key = (config.get_harvest_url(), config.get_harvest_id(), config.get_harvest_token())
+            if api_key not in apis:
+                rate_limiter = rate_limiters.setdefault(config.get_harvest_token(), TokenBucket())
+                apis[api_key] = create_api(config, workers=workers, http_cache=http_cache,
+                                           rate_limiter=rate_limiter)
+            api = apis[api_key]
+
+            # If only the harvest user id of a person is given, the name is taken from their harvest user
+            # profile instead.
+            user_id = config.get_harvest_user_id()
+            if user_id is not None and config.get_name() is None:
+                user = api.get_user(user_id)
+                config['personal']['name'] = f'{user["first_name"]} {user["last_name"]}'
+
+            person_archive_path = os.path.join(archive_path, key)
+            time_spans = retrieve_time_spans(api, config, month, year, person_archive_path)
+            azd_prev = load_previous_azd(archive_path, key, month, year, folder=key)
+            time_spans, leave = process_time_spans(config, time_spans)
+            azd_data = create_azd_data(config, time_spans, leave, month, year, azd_prev)
+            jobs.append((key, create_render_job(azd_data, output_path, f'azd_{month}_{year}_{key}',
+                                                svg=not no_svg, overlay=overlay, engine=engine,
+                                                force=force, pdf_cache=pdf_cache,
+                                                output_cache=output_cache)))
+
+        except Exception as e:
+            click.secho(f'failed: {e}', fg='red')
+            failures.append((key, e))
 
-        for i, ts in enumerate(time_spans):
-            contributing_ratio = ts.time_delta.total_seconds() / total_time_delta.total_seconds()
-            ts.modify_end(-(total_difference_seconds * contributing_ratio))
+    # -- RENDERING --
+    click.secho(f'\nrendering {len(jobs)} documents...')
+    results = render_azd_documents([job for _, job in jobs], workers=processes)
+    for (key, _), (job, error) in zip(jobs, results):
+        if error is not None:
+            click.secho(f'[x] {key}: failed to render: {error}', fg='red')
+            failures.append((key, error))
+            continue
 
-    carry_over = -total_difference_seconds
-    click.secho(f'calculated carry over of {carry_over:.2f} seconds ({carry_over / 3600:.2f} hrs)')
+        click.secho(f'wrote output pdf: "{job.pdf_path}"')
+        if not non_archival:
+            archive_azd(job.azd_data, archive_path, key, folder=key)
 
-    # Finally, we need to order this list by the starting time to list the time spans in chronological
-    # order in the final document
-    time_spans = sorted(time_spans, key=lambda ts: ts.start_datetime)
+        echo_success(f'created document for {key}')
 
-    # -- RENDERING --
-    # We will output the raw svg file as well as the pdf. This is so that the user can potentially make
-    # manual adjustments on the svg file and then render it as pdf afterwards manually as well.
-    svg_path = os.path.join(os.getcwd(), f'azd_{month}_{year}.svg')
-    pdf_path = os.path.join(os.getcwd(), f'azd_{month}_{year}.pdf')
-
-    # Now for the actual rendering to take place we first need to wrap all the relevant data into a
-    # "AbeitszeitData" object. This will wrap the static personal information as well as the list of time
-    # spans.
-    carry_over = 0
-    if prev_key in archive:
-        azd_prev = archive[prev_key]
-        carry_over = azd_prev.carry_over_after
+    click.secho(f'\ncreated {len(configs) - len(failures)} of {len(configs)} documents')
+    for key, e in failures:
+        click.secho(f'[x] {key}: {e}', fg='red')
 
-    azd_data = ArbeitszeitData(
-        time_spans=time_spans,
-        name=CONFIG.get_name(),
-        personnel_number=CONFIG.get_personnel_number(),
-        institute=CONFIG.get_institute(),
-        working_hours=CONFIG.get_working_hours(),
-        hourly_rate=CONFIG.get_hourly_rate(),
-        carry_over=carry_over,
-        leave=leave,
-        month=month,
-        year=year,
-    )
+    if failures:
+        sys.exit(1)
 
-    create_azd_svg(
-        azd_data=azd_data,
-        output_path=svg_path
-    )
 
-    with open(svg_path, mode='rb') as svg_file, open(pdf_path, mode='wb') as pdf_file:
-        svg_content = svg_file.read()
-        pdf_content = cairosvg.svg2pdf(svg_content)
-        pdf_file.write(pdf_content)
-        click.secho(f'wrote output pdf: "{pdf_path}"')
+@click.command('archive-migrate', short_help='Imports existing archive files into the archive index')
+@click.option('-a', '--archive-path', type=click.Path(exists=True, file_okay=False), default='./azd_archive',
+              help='The path to the folder that contains the archive of past Arbeitszeit data')
+@click.option('--person', type=click.STRING, default=None,
+              help='The person to which the archive files belong. Defaults to the one from the config')
+@click.option('--batch', 'is_batch', is_flag=True,
+              help='Import an archive created by the batch command, which has one sub folder per person')
+def archive_migrate(archive_path: str,
+                    person: Optional[str],
+                    is_batch: bool):
+    """
+    Imports the "{year}_{month}.json" files of an existing archive into the archive index. This happens
+    automatically the first time an archive is used, so this command is only needed to re-import archives
+    whose files have been modified or added manually.
+    """
+    from harvest_kit_hiwi.archive import ArchiveIndex
+
+    index = ArchiveIndex(archive_path)
+    if is_batch:
+        folders = [(folder, folder) for folder in sorted(os.listdir(archive_path))
+                   if os.path.isdir(os.path.join(archive_path, folder))]
+    else:
+        folders = [(person or CONFIG.get_key(), '')]
 
-    if not non_archival:
-        # The archive path might not exist
-        if not os.path.exists(archive_path):
-            os.mkdir(archive_path)
+    for person, folder in folders:
+        num_imported = index.import_folder(person, folder)
+        echo_success(f'indexed {num_imported} archive entries for {person}')
 
-        data = azd_data.to_dict()
-        json_path = os.path.join(archive_path, f'{year}_{month}.json')
-        with open(json_path, mode='w') as file:
-            json.dump(data, file, indent=4)
-            click.secho(f'wrote archive: "{json_path}"')
+    index.close()
 
 
 cli.add_command(azd)
+cli.add_command(azd_range)
+cli.add_command(batch)
+cli.add_command(archive_migrate)
 
 if __name__ == "__main__":
     sys.exit(cli())  # pragma: no cover
@@ -1,21 +1,78 @@
 import os
+import copy
 import pathlib
-import yaml
 import time
-from typing import List
+from typing import List, Optional
 
 from decouple import config
 
 PATH = pathlib.Path(__file__).parent.absolute()
 CONFIG_PATH = os.path.join(PATH, 'config.yml')
 CONFIG_PATH = config('HARVEST_HIWI_CONFIG', default=CONFIG_PATH)
+# The folder in which all kinds of cached data are stored. None of it is essential, the folder can be deleted
+# at any point.
+CACHE_PATH = os.path.join(pathlib.Path.home(), '.cache', 'harvest_kit_hiwi')
+CACHE_PATH = config('HARVEST_HIWI_CACHE', default=CACHE_PATH)
 
 
 def load_config(path=CONFIG_PATH):
+    # Importing yaml is deferred until a config is actually needed, which keeps the startup of the command
+    # line fast for commands like "--help" that do not need one.
+    import yaml
+
     with open(path, mode='r') as file:
         return yaml.safe_load(file)
 
 
+def merge_dicts(base: dict, overrides: dict) -> dict:
+    """
+    Returns a new dict which contains all the values of `base` recursively updated with the values of
+    `overrides`. Neither of the two given dicts is modified.
+    """
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_dicts(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+
+    return merged
+
+
+def load_roster(path: str, base: 'ConfigData') -> List['ConfigData']:
+    """
+    Loads the roster YAML file at `path`, which lists all the people for which documents should be created
+    in one batch. The file has to contain a "people" list. Every element is either a (partial) config dict,
+    which is merged with the `base` config, or just the Harvest user id of a person. In the latter case the
+    name is left empty, so that it can be filled in from the Harvest user profile, and the personnel number
+    is left blank.
+
+    .. code-block:: yaml
+
+        people:
+            - personal:
+                name: 'Max Mustermann'
+                personnel_number: '1234567'
+              harvest:
+                user_id: 4018067
+            - 4018068
+
+    :returns: A list with one config per person
+    """
+    data = load_config(path)
+    configs = []
+    for person in data['people']:
+        if not isinstance(person, dict):
+            person = {
+                'harvest': {'user_id': person},
+                'personal': {'name': None, 'personnel_number': ''},
+            }
+
+        configs.append(base.merged(person))
+
+    return configs
+
+
 class Singleton(type):
     """
     This is metaclass definition, which implements the singleton pattern. The objective is that whatever
@@ -49,26 +106,33 @@ class Singleton(type):
         return cls._instances[cls]
 
 
-class Config(metaclass=Singleton):
+class ConfigData:
     """
-    This is a singleton class, which implements the access to the config file.
+    This class implements the access to the values of a config dict `data`. In contrast to the ``Config``
+    singleton, any number of these can exist at the same time, which is for example needed to process the
+    individual configurations of multiple people in one run.
     """
 
-    def __init__(self):
-        self.id = hash(time.time)
-        self.path = CONFIG_PATH
+    def __init__(self, data: dict):
+        self.data = data
 
-        # -- LOAD THE DATA FROM FILE
-        self.data = load_config(self.path)
-
-    def load(self, path: str) -> None:
+    def merged(self, overrides: dict) -> 'ConfigData':
         """
-        This function loads a custom config file at the absolute string `path`
+        Returns a new config whose values are the values of this config updated with the (possibly
+        partial) nested dict `overrides`.
+        """
+        return ConfigData(merge_dicts(self.data, overrides))
 
-        :returns: None
+    def get_key(self) -> str:
         """
-        self.path = path
-        self.data = load_config(path)
+        Returns a string which identifies the person this config belongs to. This is the Harvest user id if
+        one is configured and the personnel number otherwise.
+        """
+        user_id = self.get_harvest_user_id()
+        if user_id is not None:
+            return f'user_{user_id}'
+
+        return str(self.get_personnel_number())
 
     # == IMPLEMENTING DICT FUNCTIONALITY ==
 
@@ -126,11 +190,17 @@ class Config(metaclass=Singleton):
     def get_harvest_project_id(self) -> str:
         return self.data['harvest']['project_id']
 
+    def get_harvest_user_id(self) -> Optional[str]:
+        return self.data['harvest'].get('user_id', None)
+
     # ~ function
 
     def do_merge_daily(self) -> bool:
         return bool(self.data['function']['merge_daily'])
 
+    def get_merge_granularity(self) -> str:
+        return self.data['function'].get('merge_granularity', 'day')
+
     def do_monthly_leave(self) -> bool:
         return bool(self.data['function']['monthly_leave'])
 
@@ -158,4 +228,39 @@ class Config(metaclass=Singleton):
         return self.data['personal']['monthly_leave']
 
 
+class Config(ConfigData, metaclass=Singleton):
+    """
+    This is a singleton class, which implements the access to the config file.
+
+    The config file is only read when one of its values is accessed for the first time and not when the
+    instance is created, which happens when this module is imported.
+    """
+
+    def __init__(self):
+        self.id = hash(time.time)
+        self.path = CONFIG_PATH
+        self._data: Optional[dict] = None
+
+    @property
+    def data(self) -> dict:
+        # -- LOAD THE DATA FROM FILE
+        if self._data is None:
+            self._data = load_config(self.path)
+
+        return self._data
+
+    @data.setter
+    def data(self, value: dict) -> None:
+        self._data = value
+
+    def load(self, path: str) -> None:
+        """
+        This function loads a custom config file at the absolute string `path`
+
+        :returns: None
+        """
+        self.path = path
+        self.data = load_config(path)
+
+
 CONFIG = Config()
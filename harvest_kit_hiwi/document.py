@@ -1,64 +1,598 @@
-from typing import List, Dict
+import io
+import os
+import re
+import copy
+import json
+import hashlib
+import threading
+from xml.sax.saxutils import escape
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Iterable, Iterator, Tuple, Callable, Union
 
+import cairosvg
 import svgutils.transform as sg
 
+# pypdf is an optional dependency, which is only needed for the "overlay" rendering mode. It can be installed
+# with the "fast" extra of this package.
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
 from harvest_kit_hiwi.util import TEMPLATE_PATH
 from harvest_kit_hiwi.util import timedelta_string
+from harvest_kit_hiwi.util import atomic_write
+from harvest_kit_hiwi.cache import DiskCache
+from harvest_kit_hiwi.cache import hash_key
+from harvest_kit_hiwi.timing import Timings
+from harvest_kit_hiwi.timing import stage
 from harvest_kit_hiwi.processing import TimeSpan, ArbeitszeitData
 
+# This has to be increased whenever a change to the rendering results in a different document for the same
+# data and template, since the previously rendered documents must not be reused from the output cache then.
+RENDERER_VERSION = 1
 
-def create_azd_svg(azd_data: ArbeitszeitData,
-                   output_path: str,
-                   template_path: str = TEMPLATE_PATH):
-    fig = sg.fromfile(template_path)
-
-    # ~ Filling in the static data
-    txt_month = sg.TextElement(600, 142, str(azd_data.month), size=15)
-    txt_year = sg.TextElement(690, 142, str(azd_data.year), size=15)
-    txt_name = sg.TextElement(390, 172, str(azd_data.name), size=15)
-    txt_id = sg.TextElement(390, 204, str(azd_data.personnel_number), size=15)
-    txt_institute = sg.TextElement(390, 236, str(azd_data.institute), size=15)
-    txt_time = sg.TextElement(390, 270, str(azd_data.working_hours), size=15)
-    txt_rate = sg.TextElement(650, 270, str(azd_data.hourly_rate), size=15)
-
-    fig.append([txt_month, txt_year, txt_name, txt_id, txt_institute, txt_time, txt_rate])
-
-    # ~ Filling in the time spans into the table
-    size = 12
-    x_description = 72
-    x_date = 275
-    x_begin = 375
-    x_end = 475
-    x_working_time = 680
-    y = 363
-    delta_y = 19.4
+
+def render_background_pdf(template_hash: str,
+                          get_blank_svg: Callable[[], bytes],
+                          cache: Optional[DiskCache] = None) -> bytes:
+    """
+    Renders the blank template, whose SVG content is returned by `get_blank_svg`, to PDF. If a disk `cache`
+    is given, the result is stored there under the `template_hash`, so that it is only rendered once across
+    multiple runs and processes.
+
+    :returns: The PDF content as bytes
+    """
+    key = f'background_{template_hash}'
+    content = cache.get(key) if cache is not None else None
+    if content is None:
+        content = cairosvg.svg2pdf(bytestring=get_blank_svg())
+        if cache is not None:
+            cache.put(key, content)
+
+    return content
+
+
+class AzdTemplate:
+    """
+    A parsed SVG template for the document. Parsing the template file is comparatively expensive, which is
+    why instances should be obtained through ``AzdTemplate.load``, which caches them by path and modification
+    time. That way multiple documents created in the same process only pay the parsing cost once, while
+    changes to the template file are still picked up.
+
+    The parsed template itself is never modified. A document is created either by ``clone``, which returns
+    an independent copy of the template figure to which arbitrary elements can be appended, or by ``stamp``,
+    which temporarily inserts a text layer to directly serialize the document without copying anything.
+
+    Alternatively, ``overlay`` creates an otherwise empty SVG of the same size which only contains the text
+    layer. Its PDF version can be merged onto the PDF version of the blank template, which only has to be
+    rendered once, see ``get_background_pdf``.
+
+    .. code-block:: python
+
+        template = AzdTemplate.load(TEMPLATE_PATH)
+        svg_content = template.stamp(create_azd_text_layer(azd_data))
+
+    """
+    _cache: Dict[Tuple[str, float], 'AzdTemplate'] = {}
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        self.figure = sg.fromfile(path)
+        with open(path, mode='rb') as file:
+            self.hash = hashlib.sha256(file.read()).hexdigest()
+
+        # Stamping temporarily modifies the parsed tree, which must not happen concurrently
+        self.lock = threading.Lock()
+        self.background_pdf: Optional[bytes] = None
+
+    @classmethod
+    def load(cls, path: str = TEMPLATE_PATH) -> 'AzdTemplate':
+        """
+        Returns the parsed template for the file at `path`. The file is only parsed again if it has been
+        modified since the last call.
+        """
+        path = os.path.abspath(path)
+        key = (path, os.path.getmtime(path))
+        if key not in cls._cache:
+            # Previous versions of the same file are not needed anymore
+            for other_key in [k for k in cls._cache if k[0] == path]:
+                del cls._cache[other_key]
+
+            cls._cache[key] = cls(path)
+
+        return cls._cache[key]
+
+    def clone(self) -> sg.SVGFigure:
+        """
+        Returns a new figure which is an independent deep copy of the template.
+        """
+        fig = sg.SVGFigure()
+        fig.root = copy.deepcopy(self.figure.root)
+        return fig
+
+    def stamp(self, layer: sg.FigureElement) -> bytes:
+        """
+        Returns the serialized SVG content of the template with the given element `layer` on top.
+
+        :returns: The SVG content as bytes
+        """
+        with self.lock:
+            self.figure.root.append(layer.root)
+            try:
+                return self.figure.to_str()
+            finally:
+                self.figure.root.remove(layer.root)
+
+    def overlay(self, layer: sg.FigureElement) -> bytes:
+        """
+        Returns the serialized content of an SVG which has the same dimensions as the template but only
+        contains the given element `layer`.
+
+        :returns: The SVG content as bytes
+        """
+        fig = sg.SVGFigure()
+        for attribute in ['width', 'height', 'viewBox']:
+            if attribute in self.figure.root.attrib:
+                fig.root.set(attribute, self.figure.root.get(attribute))
+
+        fig.append(layer)
+        return fig.to_str()
+
+    def get_background_pdf(self, cache: Optional[DiskCache] = None) -> bytes:
+        """
+        Returns the PDF version of the blank template. It is only rendered once per instance. If a disk
+        `cache` is given, it is additionally stored there under the hash of the template file, so that it
+        is only rendered once across multiple runs and processes.
+
+        :returns: The PDF content as bytes
+        """
+        if self.background_pdf is None:
+            self.background_pdf = render_background_pdf(self.hash, self.figure.to_str, cache)
+
+        return self.background_pdf
+
+    def create_layer(self, azd_data: ArbeitszeitData) -> sg.GroupElement:
+        return create_azd_text_layer(azd_data)
+
+
+def merge_pdf(background: bytes, overlay: bytes) -> bytes:
+    """
+    Merges the first page of the `overlay` PDF on top of the first page of the `background` PDF. This
+    requires the optional dependency pypdf.
+
+    :returns: The merged PDF content as bytes
+    """
+    if pypdf is None:
+        raise ImportError('The overlay rendering mode requires the optional dependency "pypdf". '
+                          'Install it with "pip install pypdf".')
+
+    # The page is merged only after it has been added to the writer, which newer versions of pypdf require
+    writer = pypdf.PdfWriter()
+    writer.add_page(pypdf.PdfReader(io.BytesIO(background)).pages[0])
+    writer.pages[0].merge_page(pypdf.PdfReader(io.BytesIO(overlay)).pages[0])
+
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+# == TEXT LAYOUT ==
+# The positions at which the data is filled into the template. Both render engines create their text from
+# this layout, so that they always produce the same document.
+
+HEADER_SIZE = 15
+ROW_SIZE = 12
+ROW_Y = 363
+ROW_DELTA_Y = 19.4
+
+# (x, y, value) of the static data at the top of the document
+AZD_HEADER_FIELDS: List[Tuple[float, float, Callable[[ArbeitszeitData], str]]] = [
+    (600, 142, lambda azd_data: str(azd_data.month)),
+    (690, 142, lambda azd_data: str(azd_data.year)),
+    (390, 172, lambda azd_data: str(azd_data.name)),
+    (390, 204, lambda azd_data: str(azd_data.personnel_number)),
+    (390, 236, lambda azd_data: str(azd_data.institute)),
+    (390, 270, lambda azd_data: str(azd_data.working_hours)),
+    (650, 270, lambda azd_data: str(azd_data.hourly_rate)),
+]
+
+# (x, value) of the columns of the table, which has one row per time span
+AZD_ROW_FIELDS: List[Tuple[float, Callable[[TimeSpan], str]]] = [
+    (72, lambda ts: ts.description),
+    (275, lambda ts: ts.start_datetime.strftime('%d.%m.%Y')),
+    (375, lambda ts: ts.start_datetime.strftime('%H:%M')),
+    (475, lambda ts: ts.end_datetime.strftime('%H:%M')),
+    (680, lambda ts: timedelta_string(ts.time_delta)),
+]
+
+# (x, y, value) of the static data at the bottom of the table: leave, sum, carry over before and after
+AZD_FOOTER_FIELDS: List[Tuple[float, float, Callable[[ArbeitszeitData], str]]] = [
+    (680, 848, lambda azd_data: '04:00'),
+    (680, 848 + ROW_DELTA_Y, lambda azd_data: timedelta_string(azd_data.total_time_delta)),
+    (680, 848 + ROW_DELTA_Y * 2, lambda azd_data: '00:00'),
+    (680, 848 + ROW_DELTA_Y * 3, lambda azd_data: '00:00'),
+]
+
+
+def iter_azd_text(azd_data: ArbeitszeitData) -> Iterator[Tuple[float, float, str, int]]:
+    """
+    Iterates over all the text which fills the given `azd_data` into the template, according to the layout.
+
+    :returns: A generator of tuples (x, y, text, font size)
+    """
+    for x, y, get_value in AZD_HEADER_FIELDS:
+        yield x, y, get_value(azd_data), HEADER_SIZE
+
+    y = ROW_Y
     for ts in azd_data.time_spans:
-        txt_description = sg.TextElement(x_description, y, ts.description, size=size)
+        for x, get_value in AZD_ROW_FIELDS:
+            yield x, y, get_value(ts), ROW_SIZE
+
+        y += ROW_DELTA_Y
+
+    for x, y, get_value in AZD_FOOTER_FIELDS:
+        yield x, y, get_value(azd_data), ROW_SIZE
+
+
+def create_azd_text_layer(azd_data: ArbeitszeitData) -> sg.GroupElement:
+    """
+    Creates all the text elements which fill the given `azd_data` into the template.
+
+    :returns: A group element containing all the text elements
+    """
+    return sg.GroupElement([sg.TextElement(x, y, text, size=size) for x, y, text, size in iter_azd_text(azd_data)])
+
+
+# The same markup that svgutils creates for a ``TextElement``
+TEXT_FORMAT = ('<text x="{}" y="{}" font-size="{}" font-family="Verdana" font-weight="normal" '
+               'letter-spacing="0" text-anchor="start" fill="black">{}</text>')
+
+
+def create_azd_text_string(azd_data: ArbeitszeitData) -> str:
+    """
+    Creates the SVG markup of a group which contains all the text that fills the given `azd_data` into the
+    template. This is the string equivalent of ``create_azd_text_layer``.
+
+    :returns: The SVG markup as a string
+    """
+    return '<g>' + ''.join([TEXT_FORMAT.format(x, y, size, escape(text))
+                            for x, y, text, size in iter_azd_text(azd_data)]) + '</g>'
+
+
+class AzdStringTemplate:
+    """
+    An alternative to the ``AzdTemplate``, which treats the template as plain bytes instead of a parsed
+    element tree. The content of the template file is split once at the closing "</svg>" tag, so that
+    creating a document only means joining the part before it, the text layer as one pre-formatted string
+    and the closing tag. This avoids the construction of any element objects as well as the serialization of
+    the whole tree for every document.
+
+    It supports the same operations ``stamp``, ``overlay`` and ``get_background_pdf`` as the ``AzdTemplate``,
+    except that the layers are strings as created by ``create_azd_text_string``.
+
+    .. code-block:: python
+
+        template = AzdStringTemplate.load(TEMPLATE_PATH)
+        svg_content = template.stamp(create_azd_text_string(azd_data))
 
-        string_date = ts.start_datetime.strftime('%d.%m.%Y')
-        txt_date = sg.TextElement(x_date, y, string_date, size=size)
+    """
+    _cache: Dict[Tuple[str, float], 'AzdStringTemplate'] = {}
 
-        string_begin = ts.start_datetime.strftime('%H:%M')
-        txt_begin = sg.TextElement(x_begin, y, string_begin, size=size)
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        with open(path, mode='rb') as file:
+            content = file.read()
+        self.hash = hashlib.sha256(content).hexdigest()
 
-        string_end = ts.end_datetime.strftime('%H:%M')
-        txt_end = sg.TextElement(x_end, y, string_end, size=size)
+        index = content.rfind(b'</svg>')
+        if index < 0:
+            raise ValueError(f'The template "{path}" does not contain a closing </svg> tag')
+        self.head = content[:index]
+        self.tail = content[index:]
 
-        string_working_time = timedelta_string(ts.time_delta)
-        txt_working_time = sg.TextElement(x_working_time, y, string_working_time, size=size)
+        # The dimensions of the document are needed to create the overlay
+        root = re.search(rb'<svg\b[^>]*>', content)
+        self.attributes = dict(re.findall(rb'\s(width|height|viewBox)="([^"]*)"', root.group(0)))
 
-        fig.append([txt_description, txt_date, txt_begin, txt_end, txt_working_time])
+        self.background_pdf: Optional[bytes] = None
 
-        y += delta_y
+    @classmethod
+    def load(cls, path: str = TEMPLATE_PATH) -> 'AzdStringTemplate':
+        """
+        Returns the template for the file at `path`. The file is only read again if it has been modified
+        since the last call.
+        """
+        path = os.path.abspath(path)
+        key = (path, os.path.getmtime(path))
+        if key not in cls._cache:
+            for other_key in [k for k in cls._cache if k[0] == path]:
+                del cls._cache[other_key]
 
-    # ~ Filling in the static data at the bottom of the table
-    txt_leave = sg.TextElement(680, 848, '04:00', size=size)
-    string_sum = timedelta_string(azd_data.total_time_delta)
-    txt_sum = sg.TextElement(680, 848 + delta_y, string_sum, size=size)
-    txt_carry_before = sg.TextElement(680, 848 + delta_y * 2, '00:00', size=size)
-    txt_carry_after = sg.TextElement(680, 848 + delta_y * 3, '00:00', size=size)
+            cls._cache[key] = cls(path)
 
-    fig.append([txt_leave, txt_sum, txt_carry_before, txt_carry_after])
+        return cls._cache[key]
 
-    fig.save(output_path)
+    def stamp(self, layer: str) -> bytes:
+        """
+        Returns the SVG content of the template with the given string `layer` on top.
+
+        :returns: The SVG content as bytes
+        """
+        # Non-ASCII characters are written as character references, which is valid in any encoding the
+        # template file might declare.
+        return b''.join([self.head, layer.encode('ascii', 'xmlcharrefreplace'), self.tail])
+
+    def overlay(self, layer: str) -> bytes:
+        """
+        Returns the content of an SVG which has the same dimensions as the template but only contains the
+        given string `layer`.
+
+        :returns: The SVG content as bytes
+        """
+        attributes = b''.join([b' %s="%s"' % item for item in self.attributes.items()])
+        return b''.join([
+            b'<svg xmlns="http://www.w3.org/2000/svg"', attributes, b'>',
+            layer.encode('ascii', 'xmlcharrefreplace'),
+            b'</svg>',
+        ])
+
+    def get_background_pdf(self, cache: Optional[DiskCache] = None) -> bytes:
+        """
+        Returns the PDF version of the blank template, see ``AzdTemplate.get_background_pdf``. Both
+        template classes share the same cache entries.
+
+        :returns: The PDF content as bytes
+        """
+        if self.background_pdf is None:
+            self.background_pdf = render_background_pdf(self.hash, lambda: self.head + self.tail, cache)
+
+        return self.background_pdf
+
+    def create_layer(self, azd_data: ArbeitszeitData) -> str:
+        return create_azd_text_string(azd_data)
+
+
+# The available render engines, by the name under which they can be selected
+ENGINES = {
+    'svgutils': AzdTemplate,
+    'string': AzdStringTemplate,
+}
+
+
+def create_azd_svg(azd_data: ArbeitszeitData,
+                   output_path: str,
+                   template_path: str = TEMPLATE_PATH,
+                   template: Optional[AzdTemplate] = None,
+                   timings: Optional[Timings] = None):
+    if template is None:
+        template = AzdTemplate.load(template_path)
+
+    with stage(timings, 'svg'):
+        fig = template.clone()
+        fig.append(create_azd_text_layer(azd_data))
+        content = fig.to_str()
+
+    atomic_write(output_path, content)
     return fig
+
+
+def render_azd_content(azd_data: ArbeitszeitData,
+                       template: Union[AzdTemplate, AzdStringTemplate],
+                       svg: bool = True,
+                       overlay: bool = False,
+                       cache: Optional[DiskCache] = None,
+                       timings: Optional[Timings] = None) -> Tuple[Optional[bytes], bytes]:
+    """
+    Renders the document for the given `azd_data` with the given `template` in memory, without writing any
+    files. See ``create_azd_pdf`` for the meaning of the remaining arguments.
+
+    :returns: A tuple (svg_content, pdf_content), where the SVG content is None, if `svg` is False and the
+        overlay mode did not need to create it
+    """
+    with stage(timings, 'svg'):
+        layer = template.create_layer(azd_data)
+        svg_content = None
+        if svg or not overlay:
+            svg_content = template.stamp(layer)
+
+    with stage(timings, 'pdf'):
+        if overlay:
+            background = template.get_background_pdf(cache)
+            pdf_content = merge_pdf(background, cairosvg.svg2pdf(bytestring=template.overlay(layer)))
+        else:
+            pdf_content = cairosvg.svg2pdf(bytestring=svg_content)
+
+    return svg_content, pdf_content
+
+
+def create_azd_pdf(azd_data: ArbeitszeitData,
+                   output_path: str,
+                   svg_path: Optional[str] = None,
+                   template_path: str = TEMPLATE_PATH,
+                   template: Union[AzdTemplate, AzdStringTemplate, None] = None,
+                   overlay: bool = False,
+                   cache: Optional[DiskCache] = None,
+                   timings: Optional[Timings] = None,
+                   engine: str = 'svgutils') -> Optional[bytes]:
+    """
+    Creates the PDF document for the given `azd_data` at `output_path`. The SVG content is passed to the PDF
+    conversion directly in memory. Only if `svg_path` is given, the SVG is additionally written to that file
+    as well.
+
+    If `overlay` is True, only the text layer is converted to PDF and then merged onto the PDF version of the
+    blank template, which is rendered only once and optionally kept in the disk `cache`. Since the text is
+    only a small fraction of the template, this is a lot faster than converting the whole document.
+
+    `engine` selects how the SVG is created, it is one of the keys of ``ENGINES``. It is only used to load
+    the template, if no `template` is given.
+
+    If `timings` are given, the creation of the SVG and the conversion to PDF are recorded as the stages
+    "svg" and "pdf".
+
+    :returns: The SVG content of the document or None, if the overlay mode did not need to create it
+    """
+    if template is None:
+        template = ENGINES[engine].load(template_path)
+
+    svg_content, pdf_content = render_azd_content(azd_data, template, svg=svg_path is not None,
+                                                  overlay=overlay, cache=cache, timings=timings)
+    if svg_path is not None:
+        atomic_write(svg_path, svg_content)
+
+    atomic_write(output_path, pdf_content)
+    return svg_content
+
+
+def render_key(azd_data: ArbeitszeitData,
+               template_hash: str,
+               engine: str = 'svgutils',
+               overlay: bool = False) -> str:
+    """
+    Creates the key under which the documents for the given `azd_data` are stored in the output cache. The
+    key is derived from the content of everything that determines the document: the data itself, the
+    template with the given `template_hash`, the ``RENDERER_VERSION`` and the rendering mode.
+
+    :returns: The key as a hex digest
+    """
+    data = json.dumps(azd_data.to_dict(), sort_keys=True, default=str)
+    return hash_key(data, template_hash, RENDERER_VERSION, engine, overlay)
+
+
+class RenderJob:
+    """
+    Describes the rendering of a single document: The data `azd_data` is filled into the template at
+    `template_path` and written as PDF to `pdf_path` and optionally as SVG to `svg_path`. `overlay`, `cache`
+    and `engine` select the rendering mode, see ``create_azd_pdf``. Instances are passed to the worker processes
+    of ``render_azd_documents`` and thus have to be picklable.
+
+    If an `output_cache` is given, the rendered files are stored there and an unchanged document is not
+    rendered again but copied from the cache, unless `force` is True.
+    """
+    def __init__(self,
+                 azd_data: ArbeitszeitData,
+                 svg_path: Optional[str],
+                 pdf_path: str,
+                 template_path: str = TEMPLATE_PATH,
+                 overlay: bool = False,
+                 cache: Optional[DiskCache] = None,
+                 engine: str = 'svgutils',
+                 output_cache: Optional[DiskCache] = None,
+                 force: bool = False):
+        self.azd_data = azd_data
+        self.svg_path = svg_path
+        self.pdf_path = pdf_path
+        self.template_path = template_path
+        self.overlay = overlay
+        self.cache = cache
+        self.engine = engine
+        self.output_cache = output_cache
+        self.force = force
+
+
+def reuse_output(output_cache: DiskCache, key: str, pdf_path: str, svg_path: Optional[str] = None) -> bool:
+    """
+    Writes the documents which were stored under the given `key` in the `output_cache` to `pdf_path` and
+    optionally `svg_path`.
+
+    :returns: True if all the requested files were found in the cache and False otherwise
+    """
+    if svg_path is not None and not output_cache.contains(f'svg_{key}'):
+        return False
+
+    # The files are copied rather than hard linked, because the user may well edit them in place, which must
+    # not modify the cache
+    if not output_cache.copy_to(f'pdf_{key}', pdf_path):
+        return False
+
+    return svg_path is None or output_cache.copy_to(f'svg_{key}', svg_path)
+
+
+def render_job(job: RenderJob,
+               template: Union[AzdTemplate, AzdStringTemplate, None] = None,
+               timings: Optional[Timings] = None) -> str:
+    """
+    Renders the document described by the given `job`. All output files are written atomically, so that
+    an interrupted run never leaves a partially written document behind.
+
+    If the job has an output cache which already contains the document, the files are taken from there
+    instead, which is counted as "documents_cached" in the `timings`.
+
+    :returns: The path of the created PDF file
+    """
+    # Within one (worker) process every template is only parsed once
+    if template is None:
+        template = ENGINES[job.engine].load(job.template_path)
+
+    output_cache = job.output_cache
+    if output_cache is not None:
+        key = render_key(job.azd_data, template.hash, job.engine, job.overlay)
+        if not job.force and reuse_output(output_cache, key, job.pdf_path, job.svg_path):
+            if timings is not None:
+                timings.count('documents_cached')
+            return job.pdf_path
+
+    svg_content, pdf_content = render_azd_content(
+        azd_data=job.azd_data,
+        template=template,
+        svg=job.svg_path is not None,
+        overlay=job.overlay,
+        cache=job.cache,
+        timings=timings,
+    )
+
+    if job.svg_path is not None:
+        atomic_write(job.svg_path, svg_content)
+    atomic_write(job.pdf_path, pdf_content)
+
+    if output_cache is not None:
+        if job.svg_path is not None:
+            output_cache.put(f'svg_{key}', svg_content)
+        output_cache.put(f'pdf_{key}', pdf_content)
+
+    return job.pdf_path
+
+
+def render_azd_documents(jobs: Iterable[RenderJob],
+                         workers: Optional[int] = None,
+                         ) -> Iterator[Tuple[RenderJob, Optional[Exception]]]:
+    """
+    Renders all the given `jobs` using a pool of `workers` processes, which defaults to the number of CPUs.
+    The conversion to PDF is CPU-bound, which is why multiple documents can be rendered truly in parallel
+    this way. With only a single worker, all jobs are rendered one after another in the current process.
+
+    The results are yielded in the order of the given jobs, regardless of which one actually finishes
+    first. A failing job does not affect the other jobs, instead its exception is yielded alongside it.
+
+    :returns: A generator of tuples (job, exception), where exception is None if the job was successful
+    """
+    jobs = list(jobs)
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+
+    # The background for the overlay mode is prepared up front, so that the workers do not all render it
+    # at the same time but instead find it in the cache (or inherit it, if the processes are forked).
+    for job in jobs:
+        if job.overlay:
+            ENGINES[job.engine].load(job.template_path).get_background_pdf(job.cache)
+
+    if workers <= 1:
+        for job in jobs:
+            try:
+                render_job(job)
+                yield job, None
+            except Exception as e:
+                yield job, e
+
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(render_job, job) for job in jobs]
+        for job, future in zip(jobs, futures):
+            try:
+                future.result()
+                yield job, None
+            except Exception as e:
+                yield job, e
@@ -1,53 +1,346 @@
+import time
+import datetime
 import requests
-from typing import List
+from requests.adapters import HTTPAdapter, DEFAULT_POOLSIZE
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Union, Iterator, Tuple, Iterable
+
+from harvest_kit_hiwi.cache import DiskCache
+from harvest_kit_hiwi.timing import Timings
+from harvest_kit_hiwi.transport import RateLimiter
+from harvest_kit_hiwi.transport import TokenBucket
+from harvest_kit_hiwi.transport import CachingAdapter
+from harvest_kit_hiwi.transport import get_retry_delay
+from harvest_kit_hiwi.transport import decode_json
+from harvest_kit_hiwi.transport import ACCEPT_ENCODING
+from harvest_kit_hiwi.transport import RETRY_STATUS_CODES
+from harvest_kit_hiwi.transport import DEFAULT_RETRIES
+from harvest_kit_hiwi.transport import DEFAULT_BACKOFF
+from harvest_kit_hiwi.transport import DEFAULT_TIMEOUT
+
+
+# The fields of a time entry which are actually used by this package. Passing these as the `fields` of
+# ``HarvestApi.get_time_entries`` drops all the other nested objects of an entry right after it was received.
+TIME_ENTRY_FIELDS = (
+    'id',
+    'spent_date',
+    'hours',
+    'created_at',
+    'updated_at',
+    'task.name',
+    'project.id',
+    'user.id',
+)
+
+
+def compile_fields(fields: Iterable[str]) -> dict:
+    """
+    Converts the list of dotted field names `fields` such as "task.name" into a nested dict, which maps every
+    key either to the dict of its sub fields or to None, if the value is to be kept as a whole.
+    """
+    tree = {}
+    for field in fields:
+        node = tree
+        *parents, name = field.split('.')
+        for parent in parents:
+            child = node.get(parent, {})
+            # A parent which is already kept as a whole does not need any of its sub fields listed
+            if child is None:
+                break
+            node = node.setdefault(parent, child)
+        else:
+            node[name] = None
+
+    return tree
+
+
+def project_fields(item: dict, tree: dict) -> dict:
+    """
+    Returns a new dict with only those values of `item` which are selected by the field `tree`, see
+    ``compile_fields``. Fields which are missing from the item are skipped.
+    """
+    result = {}
+    for key, sub_tree in tree.items():
+        if key in item:
+            value = item[key]
+            if sub_tree and isinstance(value, dict):
+                value = project_fields(value, sub_tree)
+            result[key] = value
+
+    return result
+
+
+def date_string(value: Union[datetime.date, str]) -> str:
+    """
+    Converts the given date `value` into the "YYYY-MM-DD" format which is expected by the Harvest API. Strings
+    are assumed to already have the correct format and are returned unchanged.
+    """
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime('%Y-%m-%d')
+
+    return value
+
+
+def time_entry_params(project_id: str,
+                      from_date: Optional[Union[datetime.date, str]] = None,
+                      to_date: Optional[Union[datetime.date, str]] = None,
+                      updated_since: Optional[Union[datetime.datetime, str]] = None,
+                      user_id: Optional[str] = None) -> dict:
+    """
+    Creates the query parameters for the "time_entries" endpoint of the Harvest API from the given filters.
+    See ``HarvestApi.iter_time_entries`` for their meaning.
+    """
+    params = {
+        'project_id': str(project_id)
+    }
+    if from_date is not None:
+        params['from'] = date_string(from_date)
+    if to_date is not None:
+        params['to'] = date_string(to_date)
+    if updated_since is not None:
+        if isinstance(updated_since, datetime.datetime):
+            updated_since = updated_since.isoformat()
+        params['updated_since'] = updated_since
+    if user_id is not None:
+        params['user_id'] = str(user_id)
+
+    return params
 
 
 class HarvestApi:
+    """
+    A minimal client for the Harvest REST API v2.
+
+    By default, all paginated resources are retrieved one page after another. If `workers` is larger than 1,
+    only the first page is requested on its own to find out the total number of pages and all the remaining
+    pages are then requested concurrently by a pool of `workers` threads. The results are still returned in
+    the original order. All requests pass through the `rate_limiter`, which by default is a token bucket
+    enforcing the request budget of the Harvest API. To respect that budget across multiple clients using the
+    same access token, the same limiter instance can be passed to all of them.
+
+    Requests which fail because of a connection problem, a timeout or one of the ``RETRY_STATUS_CODES``
+    (most notably "429 Too Many Requests") are repeated up to `retries` times. The delay between the attempts
+    follows the "Retry-After" header of the response, if there is one, and grows exponentially starting at
+    `backoff` seconds otherwise. Since every page is requested on its own, only the page which failed is
+    repeated and the pagination simply continues afterwards. `timeout` is the (connect, read) timeout of
+    every request in seconds. The connection pool holds `pool_size` connections, which defaults to enough
+    connections for all the `workers`.
 
+    If a disk `cache` is given, the responses are cached and revalidated with conditional requests. Cached
+    responses younger than `cache_ttl` seconds are used without contacting the server at all.
+
+    Every request is recorded in ``timings``: The total time spent on requests as the "http" stage and the
+    number of requests, cached responses and received bytes as counters. A shared `timings` object can be
+    passed to collect these numbers alongside those of other stages.
+    """
     def __init__(self,
                  url: str,
                  account_id: str,
-                 account_token: str):
+                 account_token: str,
+                 workers: int = 1,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 cache: Optional[DiskCache] = None,
+                 cache_ttl: float = 0,
+                 timings: Optional[Timings] = None,
+                 retries: int = DEFAULT_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF,
+                 timeout: Union[float, Tuple[float, float], None] = DEFAULT_TIMEOUT,
+                 pool_size: Optional[int] = None):
         self.url = url
         self.account_id = account_id
         self.account_token = account_token
+        self.workers = workers
+        self.rate_limiter = rate_limiter if rate_limiter is not None else TokenBucket()
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.timings = timings if timings is not None else Timings()
 
         # ~ computed properties
         self.time_entries_url = self.url + 'time_entries'
         self.projects_url = self.url + 'projects'
+        self.users_url = self.url + 'users'
 
         # ~ setting up the remote session
         self.session = requests.session()
         self.session.headers.update({
             'Authorization': f'Bearer {self.account_token}',
             'Harvest-Account-Id': f'{self.account_id}',
-            'User-Agent': 'Kit Hiwi'
+            'User-Agent': 'Kit Hiwi',
+            'Accept-Encoding': ACCEPT_ENCODING,
         })
+        # The connection pool has to be at least as large as the number of threads which use it concurrently,
+        # otherwise connections would be discarded and re-opened all the time. All requests go to the same
+        # host, so a single pool is enough.
+        self.pool_size = pool_size if pool_size is not None else max(DEFAULT_POOLSIZE, self.workers)
+        pool_kwargs = {'pool_connections': 1, 'pool_maxsize': self.pool_size}
+        if self.cache is not None:
+            adapter = CachingAdapter(self.cache, ttl=self.cache_ttl, **pool_kwargs)
+        else:
+            adapter = HTTPAdapter(**pool_kwargs)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
-    def get_projects(self) -> List[dict]:
-        params = {}
-        projects = []
-        next_page = 1
-        while next_page is not None:
-            params.update({'page': next_page})
-            response = self.session.get(self.projects_url, params=params)
-            data = response.json()
-            projects += data['projects']
-            next_page = data['next_page']
+    def request(self, url: str, params: Optional[dict] = None) -> requests.Response:
+        """
+        Sends a GET request to `url` with the query `params`, respecting the rate limit, and records it in
+        the ``timings``. Temporary failures are retried, see the class description.
+
+        :returns: The response of the last attempt
+        """
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                with self.timings.stage('http'):
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retries:
+                    raise
+                response = None
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.retries:
+                    break
+
+            self.timings.count('http_retries')
+            time.sleep(get_retry_delay(response, attempt, self.backoff))
+            attempt += 1
 
-        return projects
-
-    def get_time_entries(self, project_id: str) -> List[dict]:
-        params = {
-            'project_id': str(project_id)
-        }
-        time_entries = []
-        next_page = 1
-        while next_page is not None:
-            params.update({'page': next_page})
-            response = self.session.get(self.time_entries_url, params=params)
-            data = response.json()
-            time_entries += data['time_entries']
+        self.timings.count('http_requests')
+        self.timings.count('http_bytes', len(response.content))
+        if getattr(response, 'from_cache', False):
+            self.timings.count('http_cached')
+
+        return response
+
+    def get_page(self,
+                 url: str,
+                 params: dict,
+                 page: int,
+                 key: Optional[str] = None,
+                 fields: Optional[Iterable[str]] = None) -> dict:
+        """
+        Requests the single page number `page` of the paginated resource at `url` with the additional query
+        `params`. If `fields` are given, only those fields are kept of the items in the list `key` of the
+        response, see ``compile_fields``.
+
+        :returns: The decoded JSON response
+        """
+        response = self.request(url, params={**params, 'page': page})
+        response.raise_for_status()
+        data = decode_json(response.content)
+        if key is not None and fields is not None:
+            tree = compile_fields(fields)
+            data[key] = [project_fields(item, tree) for item in data[key]]
+
+        return data
+
+    def iter_pages(self,
+                   url: str,
+                   key: str,
+                   params: dict,
+                   fields: Optional[Iterable[str]] = None) -> Iterator[List[dict]]:
+        """
+        Iterates over all pages of the paginated resource at `url` with the given query `params`. `key` is
+        the name of the field of the response which contains the actual list of items. If `fields` are
+        given, the items are reduced to only these fields as soon as a page is received.
+
+        Every page is yielded as soon as it is available, which means that the processing of the items can
+        already start while the following pages are still being retrieved.
+
+        :returns: A generator of the lists of items, one list per page, in the order of the pages
+        """
+        data = self.get_page(url, params, 1, key, fields)
+        yield data[key]
+
+        if self.workers > 1 and data.get('total_pages'):
+            pages = range(2, data['total_pages'] + 1)
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                # "map" returns the results in the order of the pages, regardless of which request finishes
+                # first.
+                for page_data in executor.map(lambda page: self.get_page(url, params, page, key, fields), pages):
+                    yield page_data[key]
+
+        else:
             next_page = data['next_page']
+            while next_page is not None:
+                data = self.get_page(url, params, next_page, key, fields)
+                yield data[key]
+                next_page = data['next_page']
+
+    def iter_paginated(self,
+                       url: str,
+                       key: str,
+                       params: dict,
+                       fields: Optional[Iterable[str]] = None) -> Iterator[dict]:
+        """
+        Iterates over all the individual items of the paginated resource at `url`. See ``iter_pages``.
+
+        :returns: A generator of the item dicts
+        """
+        for items in self.iter_pages(url, key, params, fields):
+            yield from items
+
+    def get_paginated(self,
+                      url: str,
+                      key: str,
+                      params: dict,
+                      fields: Optional[Iterable[str]] = None) -> List[dict]:
+        """
+        Retrieves all pages of the paginated resource at `url` with the given query `params`. `key` is the
+        name of the field of the response which contains the actual list of items. See ``iter_pages``.
+
+        :returns: The concatenated list of the items from all pages
+        """
+        return list(self.iter_paginated(url, key, params, fields))
+
+    def get_projects(self) -> List[dict]:
+        return self.get_paginated(self.projects_url, 'projects', {})
+
+    def get_user(self, user_id: str) -> dict:
+        response = self.request(f'{self.users_url}/{user_id}')
+        response.raise_for_status()
+        return decode_json(response.content)
+
+    def iter_time_entries(self,
+                          project_id: str,
+                          from_date: Optional[Union[datetime.date, str]] = None,
+                          to_date: Optional[Union[datetime.date, str]] = None,
+                          updated_since: Optional[Union[datetime.datetime, str]] = None,
+                          user_id: Optional[str] = None,
+                          fields: Optional[Iterable[str]] = None,
+                          ) -> Iterator[dict]:
+        """
+        Iterates over all the time entries of the project with the given `project_id`, retrieving the pages
+        from the API on demand.
+
+        The optional arguments are passed on to the Harvest API as query parameters, which means that the
+        filtering happens on the server side and only the matching entries have to be paginated at all.
+        `from_date` and `to_date` are both inclusive and refer to the "spent_date" of an entry.
+        `updated_since` only returns those entries which have been modified after the given point in time.
+        `user_id` only returns the entries of that Harvest user, which is necessary if multiple people track
+        their time in the same project. If `fields` are given, for example ``TIME_ENTRY_FIELDS``, the entries
+        are reduced to only these fields, see ``compile_fields``.
+
+        :returns: A generator of the raw time entry dicts
+        """
+        params = time_entry_params(project_id, from_date, to_date, updated_since, user_id)
+        return self.iter_paginated(self.time_entries_url, 'time_entries', params, fields)
+
+    def get_time_entries(self,
+                         project_id: str,
+                         from_date: Optional[Union[datetime.date, str]] = None,
+                         to_date: Optional[Union[datetime.date, str]] = None,
+                         updated_since: Optional[Union[datetime.datetime, str]] = None,
+                         user_id: Optional[str] = None,
+                         fields: Optional[Iterable[str]] = None,
+                         ) -> List[dict]:
+        """
+        Retrieves all the time entries of the project with the given `project_id`. See ``iter_time_entries``
+        for the meaning of the optional arguments.
 
-        return time_entries
+        :returns: A list of the raw time entry dicts
+        """
+        return list(self.iter_time_entries(project_id, from_date, to_date, updated_since, user_id, fields))
@@ -1,21 +1,47 @@
 import datetime
-from typing import List
+from typing import List, Iterable, Iterator, Optional, Dict, Tuple
 
-from dateutil import parser
+
+def parse_timestamp(value: str) -> datetime.datetime:
+    """
+    Parses the ISO 8601 timestamp string `value` as it is returned by the Harvest API, for example
+    "2022-10-04T09:12:43Z".
+
+    This uses the fast ``datetime.fromisoformat``, for which the "Z" suffix is replaced with an explicit UTC
+    offset first, because older python versions do not understand it. Only if that fails, the much slower
+    but more lenient generic parser of dateutil is used.
+    """
+    try:
+        if value.endswith('Z'):
+            return datetime.datetime.fromisoformat(value[:-1] + '+00:00')
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        from dateutil import parser
+        return parser.parse(value)
+
+
+def get_duration(time_delta: datetime.timedelta) -> float:
+    """
+    Returns the length of the given `time_delta` in hours. This counts all the whole seconds including full
+    days, so that time spans longer than a day (such as merged weeks) have the correct duration.
+    """
+    return (time_delta.days * 86400 + time_delta.seconds) / 3600
 
 
 class TimeSpan:
 
+    __slots__ = ('start_datetime', 'end_datetime', 'description_set', 'time_delta', 'duration')
+
     def __init__(self,
                  start: datetime.datetime,
                  end: datetime.datetime,
-                 description_set: set = set()):
+                 description_set: Optional[set] = None):
         self.start_datetime = start
         self.end_datetime = end
-        self.description_set = description_set
+        self.description_set = description_set if description_set is not None else set()
 
         self.time_delta = self.end_datetime - self.start_datetime
-        self.duration = self.time_delta.seconds / 3600
+        self.duration = get_duration(self.time_delta)
 
     @property
     def description(self):
@@ -35,7 +61,7 @@ class TimeSpan:
             self.end_datetime -= time_delta
 
         self.time_delta = self.end_datetime - self.start_datetime
-        self.duration = self.time_delta.seconds / 3600
+        self.duration = get_duration(self.time_delta)
 
     def merge(self, other: 'TimeSpan'):
         start_datetime = self.start_datetime
@@ -52,7 +78,7 @@ class TimeSpan:
         return {
             'start': self.start_datetime.isoformat(),
             'end': self.end_datetime.isoformat(),
-            'description_set': list(self.description_set)
+            'description_set': sorted(self.description_set)
         }
 
     # -- MAGIC METHODS --
@@ -82,7 +108,7 @@ class TimeSpan:
 
     @classmethod
     def from_time_entry(cls, time_entry: dict):
-        start = parser.parse(time_entry['created_at'])
+        start = parse_timestamp(time_entry['created_at'])
         hours = time_entry['hours']
 
         time_delta = datetime.timedelta(hours=hours)
@@ -93,6 +119,14 @@ class TimeSpan:
 
         return cls(start, end, descriptions)
 
+    @classmethod
+    def from_time_entries(cls, time_entries: Iterable[dict]) -> List['TimeSpan']:
+        """
+        Converts a whole list of raw Harvest `time_entries`, such as a page of an API response, into
+        TimeSpan objects at once.
+        """
+        return [cls.from_time_entry(time_entry) for time_entry in time_entries]
+
     @classmethod
     def from_dict(cls, data: dict):
         return cls(
@@ -102,6 +136,172 @@ class TimeSpan:
         )
 
 
+def iter_time_spans(time_entries: Iterable[dict],
+                    month: Optional[int] = None,
+                    year: Optional[int] = None) -> Iterator[TimeSpan]:
+    """
+    Lazily converts the given raw Harvest `time_entries` into TimeSpan objects. If `month` and / or `year`
+    are given, only the time spans starting within that month / year are yielded.
+
+    Since `time_entries` may be any iterable, this can directly consume the generator returned by
+    ``HarvestApi.iter_time_entries``, in which case the conversion overlaps with the retrieval of the
+    remaining pages and the full list of raw entries is never held in memory.
+
+    :returns: A generator of TimeSpan objects
+    """
+    month = int(month) if month is not None else None
+    year = int(year) if year is not None else None
+    for time_entry in time_entries:
+        time_span = TimeSpan.from_time_entry(time_entry)
+        if month is not None and time_span.start_datetime.month != month:
+            continue
+        if year is not None and time_span.start_datetime.year != year:
+            continue
+
+        yield time_span
+
+
+def partition_by_month(time_spans: Iterable[TimeSpan]) -> Dict[Tuple[int, int], List[TimeSpan]]:
+    """
+    Partitions the given `time_spans` in a single pass by the month in which they start.
+
+    :returns: A dict whose keys are tuples (month, year) and whose values are the lists of the time spans
+        starting in that month, in their original order
+    """
+    partitions: Dict[Tuple[int, int], List[TimeSpan]] = {}
+    for ts in time_spans:
+        key = (ts.start_datetime.month, ts.start_datetime.year)
+        partition = partitions.get(key)
+        if partition is None:
+            partitions[key] = [ts]
+        else:
+            partition.append(ts)
+
+    return partitions
+
+
+MERGE_GRANULARITIES = ('day', 'week')
+
+
+def merge_daily(time_spans: Iterable[TimeSpan], granularity: str = 'day') -> List[TimeSpan]:
+    """
+    Merges all the given `time_spans` which start within the same calendar day into a single time span.
+    The merged time span starts at the earliest start of that day, its duration is the sum of all the
+    durations and its descriptions are the union of all descriptions. If `granularity` is "week" instead,
+    all time spans of the same calendar week are merged.
+
+    The time spans are bucketed in a single pass, keyed by the full date, and each merged time span is only
+    created once per bucket.
+
+    :returns: A list of the merged time spans in chronological order
+    """
+    if granularity == 'day':
+        get_key = datetime.datetime.date
+    elif granularity == 'week':
+        get_key = lambda dt: dt.isocalendar()[:2]
+    else:
+        raise ValueError(f'unknown merge granularity "{granularity}", has to be one of {MERGE_GRANULARITIES}')
+
+    buckets: Dict[object, list] = {}
+    for ts in time_spans:
+        key = get_key(ts.start_datetime)
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [ts.start_datetime, ts.time_delta, set(ts.description_set)]
+        else:
+            if ts.start_datetime < bucket[0]:
+                bucket[0] = ts.start_datetime
+            bucket[1] += ts.time_delta
+            bucket[2].update(ts.description_set)
+
+    merged = [TimeSpan(start, start + time_delta, descriptions)
+              for start, time_delta, descriptions in buckets.values()]
+    merged.sort(key=lambda ts: ts.start_datetime)
+
+    return merged
+
+
+class CarryOver:
+    """
+    The record of the working time balance of a month, as it is computed by ``clip_time_spans``. All values
+    are in seconds.
+
+    :ivar total_seconds: The documented working time before any clipping
+    :ivar due_seconds: The working time which was due, which is the contractual working time minus leave
+    :ivar clipped_seconds: The amount of overtime which was removed from the time spans by clipping
+    """
+    def __init__(self,
+                 total_seconds: float,
+                 due_seconds: float,
+                 clipped_seconds: float = 0):
+        self.total_seconds = total_seconds
+        self.due_seconds = due_seconds
+        self.clipped_seconds = clipped_seconds
+
+    @property
+    def overtime_seconds(self) -> float:
+        """
+        The difference between the documented and the due working time before clipping. This is negative if
+        less time was documented than was due.
+        """
+        return self.total_seconds - self.due_seconds
+
+    @property
+    def carry_over_seconds(self) -> float:
+        """
+        The carry over which results from the documented working time of the month alone, without clipping.
+        """
+        return -self.overtime_seconds
+
+    @property
+    def clipped(self) -> bool:
+        return self.clipped_seconds > 0
+
+    def to_dict(self) -> dict:
+        return {
+            'total_seconds': self.total_seconds,
+            'due_seconds': self.due_seconds,
+            'clipped_seconds': self.clipped_seconds,
+        }
+
+
+def clip_time_spans(time_spans: List[TimeSpan],
+                    working_hours: float,
+                    leave: float = 0,
+                    clip: bool = True) -> Tuple[List[TimeSpan], CarryOver]:
+    """
+    Computes the working time balance of the given `time_spans` with respect to the due `working_hours`
+    minus the `leave` (both in hours). If `clip` is True and more time than due was documented, the overtime
+    is removed from all time spans in proportion to their durations, so that the documented time exactly
+    matches the due time.
+
+    All durations are collected in a single pass, so that the clipping amounts to multiplying every
+    duration with the same factor. The given time spans are not modified, instead new ones are created for
+    the clipped result.
+
+    :returns: A tuple (time_spans, carry_over) of the possibly clipped time spans and the CarryOver record
+    """
+    durations = [ts.time_delta.total_seconds() for ts in time_spans]
+    total_seconds = sum(durations)
+    due_seconds = float(working_hours) * 3600 - float(leave) * 3600
+    carry_over = CarryOver(total_seconds, due_seconds)
+
+    overtime_seconds = carry_over.overtime_seconds
+    if not clip or overtime_seconds <= 0 or total_seconds <= 0:
+        return list(time_spans), carry_over
+
+    factor = 1 - overtime_seconds / total_seconds
+    clipped_time_spans = [
+        TimeSpan(ts.start_datetime,
+                 ts.start_datetime + datetime.timedelta(seconds=duration * factor),
+                 ts.description_set)
+        for ts, duration in zip(time_spans, durations)
+    ]
+    carry_over.clipped_seconds = overtime_seconds
+
+    return clipped_time_spans, carry_over
+
+
 class ArbeitszeitData:
 
     def __init__(self,
@@ -131,6 +331,16 @@ class ArbeitszeitData:
         for ts in self.time_spans:
             self.total_time_delta += ts.time_delta
 
+    @property
+    def carry_over_after(self) -> float:
+        """
+        The carry over in seconds which results at the end of this month and which has to be passed on to the
+        next month. It is the carry over from the previous month plus the difference between the working time
+        that was due (the contractual working hours minus the leave) and the documented working time.
+        """
+        due_seconds = (float(self.working_hours) - float(self.leave)) * 3600
+        return self.carry_over_before + due_seconds - self.total_time_delta.total_seconds()
+
     def to_dict(self) -> dict:
         return {
             'name': self.name,
@@ -0,0 +1,204 @@
+import os
+import json
+import sqlite3
+import datetime
+from typing import List, Optional, Union
+
+from harvest_kit_hiwi.harvest import HarvestApi, date_string
+
+TIME_ENTRY_STORE_NAME = 'time_entries.sqlite'
+
+
+class TimeEntryStore:
+    """
+    A persistent local copy of the Harvest time entries, which is stored as an SQLite database at the given
+    `path`.
+
+    The store is filled with the complete history of a project once and is afterwards kept up to date
+    incrementally: Every ``sync`` only requests those entries from the API which have been updated since the
+    most recent update that is already known locally. The cached entries can then be queried by date without
+    any network access at all.
+
+    Entries which have been deleted on Harvest can not be detected by an incremental sync, because the API
+    simply does not return them anymore. Only a full sync compares the complete list of entries and marks
+    all local entries which are missing remotely as deleted. These tombstones are kept in the database but
+    are excluded from all queries.
+
+    .. code-block:: python
+
+        store = TimeEntryStore('azd_archive/time_entries.sqlite')
+        store.sync(api, project_id)
+        time_entries = store.get_time_entries(project_id, from_date, to_date)
+
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS time_entries ('
+                '    id INTEGER PRIMARY KEY,'
+                '    project_id TEXT NOT NULL,'
+                '    spent_date TEXT NOT NULL,'
+                '    updated_at TEXT NOT NULL,'
+                '    deleted INTEGER NOT NULL DEFAULT 0,'
+                '    data TEXT NOT NULL,'
+                '    created_at TEXT'
+                ')'
+            )
+            # Stores which were created before the "created_at" column existed are migrated by filling the new
+            # column from the JSON data of the entries once
+            columns = [row[1] for row in self.connection.execute('PRAGMA table_info(time_entries)')]
+            if 'created_at' not in columns:
+                self.connection.execute('ALTER TABLE time_entries ADD COLUMN created_at TEXT')
+                self.connection.execute("UPDATE time_entries SET created_at = json_extract(data, '$.created_at')")
+
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS time_entries_date '
+                'ON time_entries (project_id, spent_date)'
+            )
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS time_entries_created '
+                'ON time_entries (project_id, created_at)'
+            )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS syncs ('
+                '    project_id TEXT PRIMARY KEY,'
+                '    updated_since TEXT NOT NULL,'
+                '    synced_at TEXT NOT NULL'
+                ')'
+            )
+
+    @classmethod
+    def from_archive(cls, archive_path: str) -> 'TimeEntryStore':
+        """
+        Opens the store which is located inside the archive folder `archive_path`, creating the folder if it
+        does not exist yet.
+        """
+        if not os.path.exists(archive_path):
+            os.makedirs(archive_path)
+
+        return cls(os.path.join(archive_path, TIME_ENTRY_STORE_NAME))
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def get_updated_since(self, project_id: str) -> Optional[str]:
+        """
+        Returns the most recent "updated_at" timestamp of all entries of the project `project_id` that have
+        been synced so far or None if the project has never been synced.
+        """
+        row = self.connection.execute(
+            'SELECT updated_since FROM syncs WHERE project_id = ?',
+            (str(project_id), )
+        ).fetchone()
+        return row[0] if row else None
+
+    def update(self, project_id: str, time_entries: List[dict]) -> None:
+        """
+        Inserts the given `time_entries` of the project `project_id` into the store, replacing all previous
+        versions of the same entries.
+
+        :returns: None
+        """
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO time_entries '
+                '(id, project_id, spent_date, updated_at, deleted, data, created_at) '
+                'VALUES (?, ?, ?, ?, 0, ?, ?)',
+                [(te['id'], str(project_id), te['spent_date'], te['updated_at'], json.dumps(te),
+                  te.get('created_at'))
+                 for te in time_entries]
+            )
+
+    def mark_deleted(self, project_id: str, existing_ids: List[int]) -> int:
+        """
+        Marks all the entries of the project `project_id` which are not part of `existing_ids` as deleted.
+
+        :returns: The number of entries which have been newly marked as deleted
+        """
+        with self.connection:
+            self.connection.execute('CREATE TEMPORARY TABLE IF NOT EXISTS existing_ids (id INTEGER PRIMARY KEY)')
+            self.connection.execute('DELETE FROM existing_ids')
+            self.connection.executemany('INSERT OR IGNORE INTO existing_ids (id) VALUES (?)',
+                                        [(i, ) for i in existing_ids])
+            cursor = self.connection.execute(
+                'UPDATE time_entries SET deleted = 1 '
+                'WHERE project_id = ? AND deleted = 0 AND id NOT IN (SELECT id FROM existing_ids)',
+                (str(project_id), )
+            )
+            return cursor.rowcount
+
+    def sync(self,
+             api: HarvestApi,
+             project_id: str,
+             full: bool = False,
+             user_id: Optional[str] = None) -> int:
+        """
+        Brings the locally stored time entries of the project `project_id` up to date using the given `api`
+        client. If the project has been synced before, only the entries updated since then are requested,
+        unless `full` is given, in which case all entries are requested and the ones which no longer exist
+        remotely are marked as deleted. If `user_id` is given, only the entries of that user are synced, in
+        which case the store should not be shared with other users of the same project.
+
+        :returns: The number of time entries which were received from the API
+        """
+        updated_since = None if full else self.get_updated_since(project_id)
+        time_entries = api.get_time_entries(
+            project_id=project_id,
+            updated_since=updated_since,
+            user_id=user_id,
+        )
+        self.update(project_id, time_entries)
+        if updated_since is None:
+            self.mark_deleted(project_id, [te['id'] for te in time_entries])
+
+        # We use the most recent modification time which was reported by the server itself as the starting
+        # point of the next sync. This way the local clock does not matter. Entries with exactly this
+        # timestamp will be received once more next time, but that does not hurt.
+        timestamps = [te['updated_at'] for te in time_entries]
+        if updated_since is not None:
+            timestamps.append(updated_since)
+        if timestamps:
+            with self.connection:
+                self.connection.execute(
+                    'INSERT OR REPLACE INTO syncs (project_id, updated_since, synced_at) VALUES (?, ?, ?)',
+                    (str(project_id), max(timestamps), datetime.datetime.utcnow().isoformat())
+                )
+
+        return len(time_entries)
+
+    def get_time_entries(self,
+                         project_id: str,
+                         from_date: Optional[Union[datetime.date, str]] = None,
+                         to_date: Optional[Union[datetime.date, str]] = None,
+                         by: str = 'spent_date',
+                         ) -> List[dict]:
+        """
+        Returns the stored time entries of the project `project_id` whose date lies within the (inclusive)
+        range of `from_date` and `to_date`. Deleted entries are excluded. `by` is the field that is compared,
+        either "spent_date" or the UTC date of "created_at", which is what the time spans are based on.
+
+        :returns: A list of the raw time entry dicts, just as they were returned by the API
+        """
+        if by not in ('spent_date', 'created_at'):
+            raise ValueError(f'entries can only be selected by spent_date or created_at, not "{by}"')
+
+        # Both columns are compared as strings, so that the indexes can be used. A full "created_at" timestamp
+        # of a day sorts after the date of that day itself, but before the date of the following day.
+        query = 'SELECT data FROM time_entries WHERE project_id = ? AND deleted = 0'
+        params = [str(project_id)]
+        if from_date is not None:
+            query += f' AND {by} >= ?'
+            params.append(date_string(from_date))
+        if to_date is not None:
+            if by == 'spent_date':
+                query += ' AND spent_date <= ?'
+                params.append(date_string(to_date))
+            else:
+                query += ' AND created_at < ?'
+                next_date = datetime.date.fromisoformat(date_string(to_date)) + datetime.timedelta(days=1)
+                params.append(date_string(next_date))
+
+        query += ' ORDER BY spent_date, id'
+        return [json.loads(data) for data, in self.connection.execute(query, params)]
@@ -0,0 +1,94 @@
+import time
+import cProfile
+import threading
+import contextlib
+from typing import Dict, Optional, Iterator, List
+
+
+class Timings:
+    """
+    Collects the wall time spent in named stages as well as named counters, for example the number of HTTP
+    requests or processed entries. The same stage can be entered multiple times, in which case the times are
+    added up. Instances are thread-safe, so that they can be shared by the worker threads of a ``HarvestApi``.
+
+    .. code-block:: python
+
+        timings = Timings()
+        with timings.stage('processing'):
+            time_spans = merge_daily(time_spans)
+        timings.count('time_spans', len(time_spans))
+        print(timings.report())
+
+    """
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self.lock:
+            self.stages[name] = self.stages.get(name, 0) + seconds
+
+    def count(self, name: str, value: float = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {
+                'stages': dict(self.stages),
+                'counters': dict(self.counters),
+            }
+
+    def report(self) -> str:
+        """
+        :returns: A human readable multi line string with one line per stage and counter
+        """
+        lines: List[str] = []
+        with self.lock:
+            for name, seconds in self.stages.items():
+                lines.append(f'{name:<20} {seconds * 1000:>10.1f} ms')
+            for name, value in self.counters.items():
+                lines.append(f'{name:<20} {value:>10g}')
+
+        return '\n'.join(lines)
+
+
+@contextlib.contextmanager
+def stage(timings: Optional[Timings], name: str) -> Iterator[None]:
+    """
+    Times the enclosed block as the stage `name` of the given `timings`, if they are not None. This allows
+    functions to accept optional timings without having to distinguish both cases themselves.
+    """
+    if timings is None:
+        yield
+    else:
+        with timings.stage(name):
+            yield
+
+
+@contextlib.contextmanager
+def profiled(path: Optional[str]) -> Iterator[Optional[cProfile.Profile]]:
+    """
+    Profiles the enclosed block with cProfile and writes the statistics to the file `path`, which can then
+    be inspected with the ``pstats`` module or tools like snakeviz. If `path` is None, nothing is profiled.
+    """
+    if path is None:
+        yield None
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
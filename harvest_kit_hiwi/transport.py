@@ -0,0 +1,302 @@
+import time
+import json
+import base64
+import asyncio
+import threading
+import email.utils
+from collections import deque
+from typing import Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from harvest_kit_hiwi.cache import DiskCache, hash_key
+
+# A faster JSON decoder is used when one is installed, the "fast" extra of this package installs orjson.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# Brotli compressed responses can only be decoded if one of the brotli packages is installed, which is why
+# they are only requested in that case.
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# https://help.getharvest.com/api-v2/introduction/overview/general/#rate-limiting
+# The Harvest API allows 100 requests per 15 seconds for every access token.
+HARVEST_RATE_LIMIT = 100
+HARVEST_RATE_PERIOD = 15
+
+# Responses with these status codes indicate a temporary problem, which is why the request is repeated
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+DEFAULT_RETRIES = 4
+# The base delay in seconds of the exponential backoff between two attempts and its upper bound
+DEFAULT_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+# The timeouts in seconds for establishing a connection and for waiting for the response
+DEFAULT_TIMEOUT = (5.0, 30.0)
+
+
+ACCEPT_ENCODING = 'br, gzip, deflate' if brotli is not None else 'gzip, deflate'
+
+
+def decode_json(content: Union[bytes, str]):
+    """
+    Decodes the JSON `content` with the fastest available library: orjson, then ujson and finally the json
+    module of the standard library.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    if ujson is not None:
+        return ujson.loads(content)
+
+    return json.loads(content)
+
+
+def get_retry_delay(response: Optional[requests.Response],
+                    attempt: int,
+                    backoff: float = DEFAULT_BACKOFF) -> float:
+    """
+    Returns the number of seconds to wait before the next attempt of a request, after attempt number
+    `attempt` (starting at 0) has failed with the given `response`, which is None if there was no response
+    at all. If the server has sent a "Retry-After" header, either as a number of seconds or as a date, that
+    is used. Otherwise the delay grows exponentially with the number of attempts, starting at `backoff`.
+    Only the headers of the response are used, so it may just as well be an ``httpx`` response.
+    """
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+
+        try:
+            date = email.utils.parsedate_to_datetime(retry_after)
+            return max(0.0, date.timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+
+    return min(MAX_BACKOFF, backoff * 2 ** attempt)
+
+
+class RateLimiter:
+    """
+    A thread-safe sliding window rate limiter. At most `max_requests` calls to ``acquire`` will return within
+    any window of `period` seconds. All additional calls block until the oldest request of the current window
+    has expired.
+
+    A single instance can be shared between multiple threads (and multiple ``HarvestApi`` instances), which
+    makes sure that the request budget of the Harvest API is respected even if pages are fetched concurrently.
+
+    .. code-block:: python
+
+        limiter = RateLimiter(max_requests=100, period=15)
+        for page in pages:
+            limiter.acquire()
+            session.get(url, params={'page': page})
+
+    """
+    def __init__(self,
+                 max_requests: int = HARVEST_RATE_LIMIT,
+                 period: float = HARVEST_RATE_PERIOD):
+        self.max_requests = max_requests
+        self.period = period
+
+        self.timestamps = deque()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Tries to reserve a request within the current window.
+
+        :returns: 0 if the request was reserved, otherwise the number of seconds to wait before trying again
+        """
+        with self.lock:
+            now = time.monotonic()
+            while self.timestamps and now - self.timestamps[0] >= self.period:
+                self.timestamps.popleft()
+
+            if len(self.timestamps) < self.max_requests:
+                self.timestamps.append(now)
+                return 0
+
+            return self.period - (now - self.timestamps[0])
+
+    def acquire(self) -> None:
+        """
+        Blocks until another request can be made without exceeding the rate limit.
+
+        :returns: None
+        """
+        while (wait := self.reserve()) > 0:
+            time.sleep(wait)
+
+
+class TokenBucket(RateLimiter):
+    """
+    A thread-safe token bucket rate limiter with the same interface as the ``RateLimiter``. The bucket holds
+    at most `max_requests` tokens and is refilled continuously at a rate of `max_requests` per `period`
+    seconds. Every request takes one token. In contrast to the sliding window, which allows a burst of the
+    whole budget and then stalls for a full period, this spreads the requests evenly once the initial burst
+    has been used up.
+
+    .. code-block:: python
+
+        limiter = TokenBucket(max_requests=100, period=15)
+        limiter.acquire()
+
+    """
+    def __init__(self,
+                 max_requests: int = HARVEST_RATE_LIMIT,
+                 period: float = HARVEST_RATE_PERIOD):
+        super(TokenBucket, self).__init__(max_requests, period)
+        self.rate = max_requests / period
+        self.tokens = float(max_requests)
+        self.updated_at = time.monotonic()
+
+    def reserve(self) -> float:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(float(self.max_requests), self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+
+            return (1 - self.tokens) / self.rate
+
+
+class AsyncRateLimiter(RateLimiter):
+    """
+    The asyncio version of the ``RateLimiter``: Waiting for the rate limit suspends only the calling coroutine
+    instead of blocking the whole event loop. A single instance can be shared by all the ``AsyncHarvestApi``
+    clients using the same access token.
+
+    .. code-block:: python
+
+        limiter = AsyncRateLimiter()
+        await limiter.acquire()
+
+    """
+    async def acquire(self) -> None:
+        while (wait := self.reserve()) > 0:
+            await asyncio.sleep(wait)
+
+
+class CachingAdapter(HTTPAdapter):
+    """
+    A transport adapter for a ``requests`` session, which stores the responses to GET requests in the given
+    disk `cache`.
+
+    A cached response that is younger than `ttl` seconds is returned directly without any network access.
+    Older responses are revalidated with a conditional request: If the server has returned an "ETag" or a
+    "Last-Modified" header, these are sent back as "If-None-Match" and "If-Modified-Since". When the server
+    then answers with "304 Not Modified", the cached content is returned and only the headers had to be
+    transferred.
+
+    Responses which were served from the cache have the additional attribute ``from_cache`` set to True.
+    All other keyword arguments are passed on to ``HTTPAdapter``.
+
+    .. code-block:: python
+
+        session = requests.session()
+        adapter = CachingAdapter(DiskCache('/tmp/http_cache'), ttl=60)
+        session.mount('https://', adapter)
+
+    """
+    # These headers determine which account a response belongs to and thus have to be part of the cache key.
+    # Otherwise, two different accounts would share the same cached responses.
+    vary_headers = ('Authorization', 'Harvest-Account-Id', 'Accept')
+
+    def __init__(self,
+                 cache: DiskCache,
+                 ttl: float = 0,
+                 **kwargs):
+        super(CachingAdapter, self).__init__(**kwargs)
+        self.cache = cache
+        self.ttl = ttl
+
+    def get_cache_key(self, request: requests.PreparedRequest) -> str:
+        return hash_key(request.url, *[request.headers.get(header, '') for header in self.vary_headers])
+
+    def load(self, key: str):
+        content = self.cache.get(key)
+        if content is None:
+            return None
+
+        try:
+            return json.loads(content)
+        except ValueError:
+            return None
+
+    def store(self, key: str, response: requests.Response, stored_at: float) -> None:
+        # The content of the response has already been decoded at this point, which is why the headers
+        # describing the transfer encoding have to be dropped.
+        headers = {key: value for key, value in response.headers.items()
+                   if key.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')}
+        entry = {
+            'status_code': response.status_code,
+            'reason': response.reason,
+            'headers': headers,
+            'content': base64.b64encode(response.content).decode(),
+            'stored_at': stored_at,
+        }
+        self.cache.put(key, json.dumps(entry).encode())
+
+    def build_cached_response(self, request: requests.PreparedRequest, entry: dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry['status_code']
+        response.reason = entry['reason']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = base64.b64decode(entry['content'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.from_cache = True
+        return response
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        if request.method != 'GET':
+            return super(CachingAdapter, self).send(request, **kwargs)
+
+        key = self.get_cache_key(request)
+        entry = self.load(key)
+        if entry is not None:
+            if time.time() - entry['stored_at'] < self.ttl:
+                return self.build_cached_response(request, entry)
+
+            headers = CaseInsensitiveDict(entry['headers'])
+            if 'ETag' in headers:
+                request.headers['If-None-Match'] = headers['ETag']
+            if 'Last-Modified' in headers:
+                request.headers['If-Modified-Since'] = headers['Last-Modified']
+
+        response = super(CachingAdapter, self).send(request, **kwargs)
+        response.from_cache = False
+
+        if response.status_code == 304 and entry is not None:
+            # The response is still valid, which is why we only have to reset its age
+            entry['stored_at'] = time.time()
+            self.cache.put(key, json.dumps(entry).encode())
+            return self.build_cached_response(request, entry)
+
+        if response.status_code == 200:
+            headers = response.headers
+            if self.ttl > 0 or 'ETag' in headers or 'Last-Modified' in headers:
+                self.store(key, response, time.time())
+
+        return response
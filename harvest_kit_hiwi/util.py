@@ -1,7 +1,10 @@
 import os
 import math
 import pathlib
+import calendar
 import datetime
+import secrets
+from typing import Tuple, Union, Iterator
 
 PATH = pathlib.Path(__file__).parent.absolute()
 VERSION_PATH = os.path.join(PATH, 'VERSION')
@@ -40,3 +43,80 @@ def timedelta_string(time_delta: datetime.timedelta,
     total_seconds -= minutes * 60
 
     return f'{hours:02d}:{minutes:02d}'
+
+
+def month_date_range(month: int, year: int) -> Tuple[datetime.date, datetime.date]:
+    """
+    Returns a tuple (first, last) of the first and the last calendar day of the given `month` in the given
+    `year`. Both boundaries are inclusive, which is the convention the Harvest API uses for its "from" and
+    "to" query parameters.
+    """
+    month = int(month)
+    year = int(year)
+    _, num_days = calendar.monthrange(year, month)
+    return datetime.date(year, month, 1), datetime.date(year, month, num_days)
+
+
+def previous_month(month: int, year: int) -> Tuple[int, int]:
+    """
+    Returns the tuple (month, year) of the month before the given `month` in the given `year`.
+    """
+    month = int(month)
+    year = int(year)
+    if month == 1:
+        return 12, year - 1
+
+    return month - 1, year
+
+
+def iter_months(from_month: int, from_year: int, to_month: int, to_year: int) -> Iterator[Tuple[int, int]]:
+    """
+    Iterates over all the months from `from_month` in `from_year` to `to_month` in `to_year`, both inclusive.
+    Nothing is yielded if the end lies before the start.
+
+    :returns: A generator of tuples (month, year)
+    """
+    index = int(from_year) * 12 + int(from_month) - 1
+    end = int(to_year) * 12 + int(to_month) - 1
+    while index <= end:
+        yield index % 12 + 1, index // 12
+        index += 1
+
+
+def create_temp_file(folder_path: str) -> Tuple[int, str]:
+    """
+    Creates a new, empty temporary file with a unique hidden name in the folder `folder_path`. In contrast to
+    ``tempfile.mkstemp``, which only allows the owner to access the file, the file gets the same permissions
+    as one created with a regular "open", since the kernel applies the umask.
+
+    :returns: A tuple (fd, path) of the open file descriptor and the path of the file
+    """
+    while True:
+        temp_path = os.path.join(folder_path, f'.{secrets.token_hex(8)}.tmp')
+        try:
+            return os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), temp_path
+        except FileExistsError:
+            continue
+
+
+def atomic_write(path: str, content: Union[bytes, str]) -> None:
+    """
+    Writes the given `content` to the file at `path` such that the file either contains the complete
+    previous content or the complete new content at any point in time. The content is first written into a
+    temporary file in the same folder, which is then moved to the final path.
+
+    :returns: None
+    """
+    if isinstance(content, str):
+        content = content.encode()
+
+    folder_path = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = create_temp_file(folder_path)
+    try:
+        with os.fdopen(fd, mode='wb') as file:
+            file.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
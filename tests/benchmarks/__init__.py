@@ -0,0 +1,15 @@
+"""
+Benchmarks for the individual stages of the retrieval -> processing -> rendering pipeline.
+
+The benchmarks are skipped by default. To run them, set the environment variable ``HARVEST_HIWI_BENCHMARK``
+and preferably disable the output capturing to see the results as they come in:
+
+.. code-block:: console
+
+    HARVEST_HIWI_BENCHMARK=1 pytest -s tests/benchmarks
+
+The number of synthetic time entries can be chosen with ``HARVEST_HIWI_BENCHMARK_SIZES`` (default
+"100,10000", use "100,10000,1000000" for the full range). If ``HARVEST_HIWI_BENCHMARK_OUTPUT`` points to a
+JSON file, the results are written to it. If ``HARVEST_HIWI_BENCHMARK_BASELINE`` points to such a file from
+a previous run, every benchmark fails if it became more than 50% slower than its baseline result.
+"""
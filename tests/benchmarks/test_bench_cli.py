@@ -0,0 +1,23 @@
+import sys
+import subprocess
+
+from .util import measure
+from .util import BenchmarkCase
+
+# The maximum time in seconds that starting the command line may take, including the interpreter startup
+STARTUP_BUDGET = 0.5
+
+
+class BenchmarkCliStartup(BenchmarkCase):
+
+    def benchmark_command(self, name: str, args: list):
+        command = [sys.executable, '-m', 'harvest_kit_hiwi.cli', *args]
+        seconds = measure(lambda: subprocess.run(command, capture_output=True, check=True), repeat=5)
+        self.record(name, 1, seconds)
+        self.assertLess(seconds, STARTUP_BUDGET)
+
+    def test_version(self):
+        self.benchmark_command('cli.version', ['--version'])
+
+    def test_help(self):
+        self.benchmark_command('cli.help', ['--help'])
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+from harvest_kit_hiwi.processing import TimeSpan
+from harvest_kit_hiwi.processing import ArbeitszeitData
+from harvest_kit_hiwi.processing import merge_daily
+
+from .util import measure
+from .util import generate_benchmark_entries
+from .util import BenchmarkCase
+
+# The rendering depends on the cairo system library, which might not be available
+try:
+    import cairosvg
+    from harvest_kit_hiwi.document import AzdTemplate
+    from harvest_kit_hiwi.document import AzdStringTemplate
+    from harvest_kit_hiwi.document import create_azd_text_layer
+    from harvest_kit_hiwi.document import create_azd_text_string
+    from harvest_kit_hiwi.document import create_azd_svg
+except (ImportError, OSError):
+    cairosvg = None
+
+
+@unittest.skipIf(cairosvg is None, 'cairosvg is not available')
+class BenchmarkDocument(BenchmarkCase):
+
+    # The number of documents which are rendered per measurement
+    num_documents = 10
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        # One month of entries, merged into one row per day as it would appear in the document
+        time_spans = merge_daily(TimeSpan.from_time_entries(generate_benchmark_entries(80)))[:20]
+        cls.azd_data = ArbeitszeitData(
+            time_spans=time_spans,
+            name='Max Mustermann',
+            personnel_number='12345',
+            institute='ITI',
+            working_hours=40,
+            hourly_rate=12.5,
+            carry_over=0,
+            leave=4,
+            month=1,
+            year=2022,
+        )
+        cls.template = AzdTemplate.load()
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.svg_path = os.path.join(self.temp_dir.name, 'out.svg')
+        self.pdf_path = os.path.join(self.temp_dir.name, 'out.pdf')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_create_azd_svg(self):
+        def func():
+            for _ in range(self.num_documents):
+                create_azd_svg(self.azd_data, self.svg_path, template=self.template)
+
+        self.record('document.create_azd_svg', self.num_documents, measure(func))
+
+    def test_stamp_svgutils_engine(self):
+        def func():
+            for _ in range(self.num_documents):
+                self.template.stamp(create_azd_text_layer(self.azd_data))
+
+        self.record('document.stamp_svgutils', self.num_documents, measure(func))
+
+    def test_stamp_string_engine(self):
+        template = AzdStringTemplate.load()
+
+        def func():
+            for _ in range(self.num_documents):
+                template.stamp(create_azd_text_string(self.azd_data))
+
+        self.record('document.stamp_string', self.num_documents, measure(func))
+
+    def test_cairosvg_pdf_conversion(self):
+        fig = create_azd_svg(self.azd_data, self.svg_path, template=self.template)
+        svg_string = fig.to_str()
+
+        def func():
+            for _ in range(self.num_documents):
+                cairosvg.svg2pdf(bytestring=svg_string, write_to=self.pdf_path)
+
+        self.record('document.cairosvg_pdf', self.num_documents, measure(func))
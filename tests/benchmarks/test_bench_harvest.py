@@ -0,0 +1,26 @@
+from harvest_kit_hiwi.harvest import HarvestApi
+
+from .util import SIZES
+from .util import measure
+from .util import generate_benchmark_entries
+from .util import BenchmarkCase
+from .util import BenchmarkHarvestServer
+
+
+class BenchmarkHarvestApi(BenchmarkCase):
+
+    def benchmark_pagination(self, name: str, workers: int):
+        for size in SIZES:
+            time_entries = generate_benchmark_entries(size)
+            # 2000 entries per page is the maximum that the real Harvest API allows
+            with BenchmarkHarvestServer(time_entries=time_entries, per_page=2000) as server:
+                api = HarvestApi(url=server.url, account_id='id', account_token='token', workers=workers)
+                seconds = measure(lambda: api.get_time_entries('34329740'))
+
+            self.record(name, size, seconds)
+
+    def test_pagination(self):
+        self.benchmark_pagination('harvest.pagination', workers=1)
+
+    def test_concurrent_pagination(self):
+        self.benchmark_pagination('harvest.pagination_concurrent', workers=4)
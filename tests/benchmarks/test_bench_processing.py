@@ -0,0 +1,50 @@
+from harvest_kit_hiwi.processing import TimeSpan
+from harvest_kit_hiwi.processing import merge_daily
+from harvest_kit_hiwi.processing import clip_time_spans
+
+from .util import SIZES
+from .util import measure
+from .util import generate_benchmark_entries
+from .util import BenchmarkCase
+
+
+class BenchmarkProcessing(BenchmarkCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.time_entries = {size: generate_benchmark_entries(size) for size in SIZES}
+        cls.time_spans = {size: TimeSpan.from_time_entries(entries) for size, entries in cls.time_entries.items()}
+
+    def test_from_time_entry(self):
+        for size, time_entries in self.time_entries.items():
+            seconds = measure(lambda: [TimeSpan.from_time_entry(te) for te in time_entries])
+            self.record('processing.from_time_entry', size, seconds)
+
+    def test_from_time_entries(self):
+        for size, time_entries in self.time_entries.items():
+            seconds = measure(lambda: TimeSpan.from_time_entries(time_entries))
+            self.record('processing.from_time_entries', size, seconds)
+
+    def test_merge_daily(self):
+        for size, time_spans in self.time_spans.items():
+            seconds = measure(lambda: merge_daily(time_spans))
+            self.record('processing.merge_daily', size, seconds)
+
+    def test_merge_daily_scales_linearly(self):
+        size = max(1000, min(SIZES))
+        time_spans = TimeSpan.from_time_entries(generate_benchmark_entries(size))
+        time_spans_large = TimeSpan.from_time_entries(generate_benchmark_entries(size * 10))
+
+        seconds = measure(lambda: merge_daily(time_spans))
+        seconds_large = measure(lambda: merge_daily(time_spans_large))
+        self.record('processing.merge_daily', size, seconds)
+        self.record('processing.merge_daily', size * 10, seconds_large)
+        # For a linear algorithm, ten times the entries should take roughly ten times as long. The bound is
+        # generous, so that it only catches a complexity regression and not timing noise.
+        self.assertLess(seconds_large / seconds, 25)
+
+    def test_clip_time_spans(self):
+        for size, time_spans in self.time_spans.items():
+            working_hours = sum(ts.duration for ts in time_spans) / 2
+            seconds = measure(lambda: clip_time_spans(time_spans, working_hours=working_hours))
+            self.record('processing.clip_time_spans', size, seconds)
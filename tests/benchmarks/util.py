@@ -0,0 +1,102 @@
+import os
+import json
+import time
+import datetime
+import unittest
+from typing import Callable, Dict, List
+
+from ..util import LOGGER
+from ..util import create_time_entry
+from ..util import MockHarvestServer
+
+BENCHMARK = bool(os.environ.get('HARVEST_HIWI_BENCHMARK'))
+SIZES = [int(size) for size in os.environ.get('HARVEST_HIWI_BENCHMARK_SIZES', '100,10000').split(',')]
+OUTPUT_PATH = os.environ.get('HARVEST_HIWI_BENCHMARK_OUTPUT')
+BASELINE_PATH = os.environ.get('HARVEST_HIWI_BENCHMARK_BASELINE')
+# A benchmark fails if it takes longer than its baseline result times this factor
+TOLERANCE = 1.5
+
+RESULTS: Dict[str, float] = {}
+
+
+def load_baseline() -> Dict[str, float]:
+    if not BASELINE_PATH:
+        return {}
+
+    with open(BASELINE_PATH, mode='r') as file:
+        return json.load(file)
+
+
+BASELINE = load_baseline()
+
+
+def generate_benchmark_entries(num: int,
+                               per_day: int = 4,
+                               start: datetime.datetime = datetime.datetime(2022, 1, 3, 9)) -> List[dict]:
+    """
+    Generates `num` synthetic time entries with `per_day` consecutive entries of 1.5 hours on each day. Unlike
+    ``generate_time_entries``, this results in realistic numbers of entries per day, which matters for the
+    daily merging.
+    """
+    return [
+        create_time_entry(
+            entry_id=i + 1,
+            start=start + datetime.timedelta(days=i // per_day, hours=(i % per_day) * 2),
+            hours=1.5,
+            task=f'task {i % 7}',
+        )
+        for i in range(num)
+    ]
+
+
+def measure(func: Callable, repeat: int = 3) -> float:
+    """
+    Calls `func` `repeat` times and returns the best wall time of a single call in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+class BenchmarkHarvestServer(MockHarvestServer):
+    """
+    A ``MockHarvestServer`` which memorizes the filtered time entries for each query, so that serving the
+    many pages of a large data set does not filter the whole list again for every single page.
+    """
+    def __init__(self, *args, **kwargs):
+        super(BenchmarkHarvestServer, self).__init__(*args, **kwargs)
+        self.filtered = {}
+
+    def filter_time_entries(self, params: dict) -> List[dict]:
+        key = tuple(sorted((k, v) for k, v in params.items() if k != 'page'))
+        if key not in self.filtered:
+            self.filtered[key] = super(BenchmarkHarvestServer, self).filter_time_entries(params)
+
+        return self.filtered[key]
+
+
+@unittest.skipIf(not BENCHMARK, 'Benchmarks are only run if HARVEST_HIWI_BENCHMARK is set')
+class BenchmarkCase(unittest.TestCase):
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        if OUTPUT_PATH:
+            with open(OUTPUT_PATH, mode='w') as file:
+                json.dump(RESULTS, file, indent=4, sort_keys=True)
+
+    def record(self, name: str, size: int, seconds: float) -> None:
+        """
+        Records the result `seconds` of the benchmark `name` for the given number of entries `size` and checks
+        it against the baseline, if there is one.
+        """
+        key = f'{name}[{size}]'
+        RESULTS[key] = seconds
+        LOGGER.info(f'{key:<40} {seconds * 1000:>10.2f} ms {seconds / size * 1e6:>10.2f} us/entry')
+
+        if key in BASELINE:
+            self.assertLessEqual(seconds, BASELINE[key] * TOLERANCE,
+                                 f'{key} regressed from {BASELINE[key]:.4f}s to {seconds:.4f}s')
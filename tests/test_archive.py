@@ -0,0 +1,127 @@
+import os
+import json
+import datetime
+import tempfile
+import unittest
+
+from harvest_kit_hiwi.archive import ArchiveIndex
+from harvest_kit_hiwi.archive import ARCHIVE_INDEX_NAME
+from harvest_kit_hiwi.archive import ArchiveFolder
+from harvest_kit_hiwi.archive import parse_archive_file_name
+from harvest_kit_hiwi.archive import _read_archive_file
+from harvest_kit_hiwi.processing import TimeSpan, ArbeitszeitData
+
+
+def create_azd_data(month: int, year: int = 2022, carry_over: float = 0) -> ArbeitszeitData:
+    start = datetime.datetime(year, month, 3, 9)
+    return ArbeitszeitData(
+        time_spans=[TimeSpan(start, start + datetime.timedelta(hours=10), {'work'})],
+        name='Max Mustermann',
+        personnel_number='1982907',
+        institute='KIT',
+        working_hours=20,
+        hourly_rate=12.5,
+        carry_over=carry_over,
+        leave=4,
+        month=str(month),
+        year=str(year),
+    )
+
+
+class TestArchiveIndex(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.archive_path = os.path.join(self.temp_dir.name, 'azd_archive')
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_construction_basically_works(self):
+        index = ArchiveIndex(self.archive_path)
+        self.assertTrue(os.path.exists(os.path.join(self.archive_path, ARCHIVE_INDEX_NAME)))
+        self.assertIsNone(index.get('1982907', 10, 2022))
+        index.close()
+
+    def test_write_and_get(self):
+        index = ArchiveIndex(self.archive_path)
+        path = index.write('1982907', create_azd_data(10))
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual('2022_10.json', os.path.basename(path))
+
+        azd_data = index.get('1982907', 10, 2022)
+        self.assertIsInstance(azd_data, ArbeitszeitData)
+        self.assertEqual('10', azd_data.month)
+
+        # Different people must not see each other's archives
+        self.assertIsNone(index.get('other', 10, 2022))
+        index.close()
+
+    def test_get_returns_independent_objects(self):
+        index = ArchiveIndex(self.archive_path)
+        index.write('1982907', create_azd_data(10))
+
+        # Modifying the result of one lookup must not affect the following lookups of the same month
+        azd_data = index.get('1982907', 10, 2022)
+        azd_data.time_spans.clear()
+        azd_data.carry_over_before = 100
+        azd_data = index.get('1982907', 10, 2022)
+        self.assertEqual(1, len(azd_data.time_spans))
+        self.assertEqual(0, azd_data.carry_over_before)
+        index.close()
+
+    def test_import_folder_of_existing_files(self):
+        folder_path = os.path.join(self.archive_path, 'person')
+        os.makedirs(folder_path)
+        for month in range(1, 13):
+            with open(os.path.join(folder_path, f'2022_{month}.json'), mode='w') as file:
+                json.dump(create_azd_data(month).to_dict(), file)
+        with open(os.path.join(folder_path, 'notes.json'), mode='w') as file:
+            file.write('{}')
+
+        index = ArchiveIndex(self.archive_path)
+        self.assertFalse(index.is_imported('person'))
+        self.assertEqual(12, index.import_folder('person', 'person'))
+        self.assertTrue(index.is_imported('person'))
+
+        self.assertEqual(os.path.join(folder_path, '2022_5.json'), index.get_path('person', 5, 2022))
+        self.assertEqual('5', index.get('person', 5, 2022).month)
+        index.close()
+
+    def test_carry_over_after(self):
+        # 20 working hours minus 4 hours of leave are due, but only 10 hours were documented
+        azd_data = create_azd_data(10, carry_over=3600)
+        self.assertAlmostEqual(3600 + 6 * 3600, azd_data.carry_over_after)
+
+
+class TestArchiveFolder(unittest.TestCase):
+
+    def test_parse_archive_file_name(self):
+        self.assertEqual((10, 2022), parse_archive_file_name('2022_10.json'))
+        self.assertEqual((1, 2023), parse_archive_file_name('2023_1.json'))
+        self.assertIsNone(parse_archive_file_name('index.sqlite'))
+        self.assertIsNone(parse_archive_file_name('notes.json'))
+
+    def test_files_are_loaded_lazily(self):
+        with tempfile.TemporaryDirectory() as path:
+            for month in range(1, 4):
+                with open(os.path.join(path, f'2022_{month}.json'), mode='w') as file:
+                    json.dump(create_azd_data(month).to_dict(), file)
+
+            # This file is broken, but that does not matter as long as it is never accessed
+            with open(os.path.join(path, '2021_12.json'), mode='w') as file:
+                file.write('not json')
+
+            archive = ArchiveFolder(path)
+            self.assertEqual(4, len(archive))
+            self.assertEqual([(12, 2021), (1, 2022), (2, 2022), (3, 2022)], list(archive))
+            self.assertIn((2, 2022), archive)
+            self.assertIn(('2', '2022'), archive)
+            self.assertNotIn((4, 2022), archive)
+
+            azd_data = archive[(2, 2022)]
+            self.assertIsInstance(azd_data, ArbeitszeitData)
+            # The second access is served from the cache, but still returns a new object
+            hits = _read_archive_file.cache_info().hits
+            self.assertIsNot(azd_data, archive[(2, 2022)])
+            self.assertEqual(hits + 1, _read_archive_file.cache_info().hits)
@@ -0,0 +1,105 @@
+import asyncio
+import unittest
+
+from harvest_kit_hiwi.async_harvest import httpx
+from harvest_kit_hiwi.async_harvest import AsyncHarvestApi
+
+from .util import MockHarvestServer
+from .util import generate_time_entries
+
+
+@unittest.skipIf(httpx is None, 'httpx is not installed')
+class TestAsyncHarvestApi(unittest.TestCase):
+
+    project_id = '34329740'
+
+    def test_get_time_entries_paginates_concurrently(self):
+        time_entries = generate_time_entries(250)
+
+        async def main(url):
+            async with AsyncHarvestApi(url=url, account_id='id', account_token='token') as api:
+                return await api.get_time_entries(project_id=self.project_id, user_id=4018067)
+
+        with MockHarvestServer(time_entries=time_entries) as server:
+            result = asyncio.run(main(server.url))
+            self.assertEqual(3, len(server.requests))
+
+        self.assertEqual([te['id'] for te in time_entries], [te['id'] for te in result])
+
+    def test_multiple_accounts_share_client(self):
+        time_entries = generate_time_entries(150, user_id=1) + generate_time_entries(50, user_id=2)
+
+        async def main(url):
+            semaphore = asyncio.Semaphore(2)
+            async with httpx.AsyncClient() as client:
+                apis = [AsyncHarvestApi(url=url, account_id=str(i), account_token='token', client=client,
+                                        semaphore=semaphore)
+                        for i in (1, 2)]
+                results = await asyncio.gather(*[api.get_time_entries(self.project_id, user_id=i)
+                                                 for i, api in zip((1, 2), apis)])
+                # The shared client belongs to the caller and is not closed by the apis
+                for api in apis:
+                    await api.close()
+                self.assertFalse(client.is_closed)
+
+            return results
+
+        with MockHarvestServer(time_entries=time_entries) as server:
+            results = asyncio.run(main(server.url))
+
+        self.assertEqual([150, 50], [len(result) for result in results])
+
+    def test_get_user(self):
+        async def main(url):
+            async with AsyncHarvestApi(url=url, account_id='id', account_token='token') as api:
+                return await api.get_user('4018067')
+
+        with MockHarvestServer() as server:
+            user = asyncio.run(main(server.url))
+
+        self.assertEqual('Max', user['first_name'])
+
+
+    def test_throttled_page_is_retried(self):
+        time_entries = generate_time_entries(250)
+
+        async def main(url):
+            async with AsyncHarvestApi(url=url, account_id='id', account_token='token') as api:
+                return await api.get_time_entries(project_id=self.project_id)
+
+        with MockHarvestServer(time_entries=time_entries, throttle={('/time_entries', 2): 2}) as server:
+            result = asyncio.run(main(server.url))
+            self.assertEqual(5, len(server.requests))
+
+        self.assertEqual([te['id'] for te in time_entries], [te['id'] for te in result])
+
+    def test_exhausted_retries_raise_http_error(self):
+        async def main(url):
+            async with AsyncHarvestApi(url=url, account_id='id', account_token='token', retries=1) as api:
+                return await api.get_time_entries(project_id=self.project_id)
+
+        throttle = {('/time_entries', 1): 5}
+        with MockHarvestServer(time_entries=generate_time_entries(10), throttle=throttle) as server:
+            with self.assertRaises(httpx.HTTPStatusError):
+                asyncio.run(main(server.url))
+            self.assertEqual(2, len(server.requests))
+
+    def test_client_created_outside_of_event_loop(self):
+        async def main(api):
+            async with api:
+                return await api.get_time_entries(project_id=self.project_id)
+
+        with MockHarvestServer(time_entries=generate_time_entries(350)) as server:
+            # With a concurrency of 1, the requests for the pages have to wait for the semaphore
+            api = AsyncHarvestApi(url=server.url, account_id='id', account_token='token', concurrency=1)
+            result = asyncio.run(main(api))
+
+        self.assertEqual(350, len(result))
+
+
+class TestAsyncHarvestApiWithoutHttpx(unittest.TestCase):
+
+    @unittest.skipIf(httpx is not None, 'httpx is installed')
+    def test_missing_dependency_is_reported(self):
+        with self.assertRaises(ImportError):
+            AsyncHarvestApi(url='http://localhost/', account_id='id', account_token='token')
@@ -0,0 +1,103 @@
+import os
+import stat
+import time
+import tempfile
+import unittest
+from unittest import mock
+
+from harvest_kit_hiwi.cache import DiskCache, hash_key
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'cache')
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_hash_key_is_deterministic(self):
+        self.assertEqual(hash_key('a', 'b'), hash_key('a', 'b'))
+        self.assertNotEqual(hash_key('ab', ''), hash_key('a', 'b'))
+
+    def test_put_and_get(self):
+        cache = DiskCache(self.path)
+        self.assertIsNone(cache.get('key'))
+
+        cache.put('key', b'hello world')
+        self.assertTrue(cache.contains('key'))
+        self.assertEqual(b'hello world', cache.get('key'))
+        self.assertEqual(11, cache.size)
+
+        # A new instance should pick up the previously stored content
+        cache = DiskCache(self.path)
+        self.assertEqual(b'hello world', cache.get('key'))
+        self.assertEqual(11, cache.size)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = DiskCache(self.path, max_size=30)
+        cache.put('a', b'0' * 10)
+        cache.put('b', b'1' * 10)
+        cache.put('c', b'2' * 10)
+
+        # Accessing "a" makes it the most recently used entry, so "b" is evicted first
+        past = time.time() - 100
+        os.utime(cache.get_path('b'), (past, past))
+        os.utime(cache.get_path('c'), (past + 1, past + 1))
+        cache.get('a')
+
+        cache.put('d', b'3' * 10)
+        self.assertLessEqual(cache.size, 30)
+        self.assertFalse(cache.contains('b'))
+        self.assertTrue(cache.contains('a'))
+        self.assertTrue(cache.contains('d'))
+
+    def test_evict_tolerates_files_removed_by_other_processes(self):
+        cache = DiskCache(self.path, max_size=30)
+        for key in ('a', 'b', 'c'):
+            cache.put(key, b'0' * 10)
+
+        # "a" is already gone when the entries are listed, "b" and "c" are removed in between listing and evicting
+        file_paths = list(cache.file_paths())
+        os.remove(cache.get_path('a'))
+        cache.max_size = 0
+        with mock.patch.object(cache, 'file_paths', return_value=file_paths), \
+                mock.patch('os.remove', side_effect=FileNotFoundError):
+            cache.evict()
+
+        self.assertEqual(0, cache.size)
+
+    def test_copy_to(self):
+        cache = DiskCache(self.path)
+        file_path = os.path.join(self.temp_dir.name, 'out.pdf')
+        self.assertFalse(cache.copy_to('key', file_path))
+        self.assertFalse(os.path.exists(file_path))
+
+        cache.put('key', b'content')
+        for link in (False, True):
+            self.assertTrue(cache.copy_to('key', file_path, link=link))
+            with open(file_path, mode='rb') as file:
+                self.assertEqual(b'content', file.read())
+
+        # Replacing the cache entry must not change a previously linked file
+        cache.put('key', b'other')
+        with open(file_path, mode='rb') as file:
+            self.assertEqual(b'content', file.read())
+
+        # No temporary files are left behind
+        self.assertEqual(['cache', 'out.pdf'], sorted(os.listdir(self.temp_dir.name)))
+
+    def test_copy_to_is_independent_of_cache(self):
+        cache = DiskCache(self.path)
+        cache.put('key', b'content')
+        file_path = os.path.join(self.temp_dir.name, 'out.pdf')
+        self.assertTrue(cache.copy_to('key', file_path))
+
+        # The copy has the default permissions and modifying it in place does not modify the cache entry
+        regular_path = os.path.join(self.temp_dir.name, 'regular.pdf')
+        open(regular_path, mode='wb').close()
+        self.assertEqual(stat.S_IMODE(os.stat(regular_path).st_mode), stat.S_IMODE(os.stat(file_path).st_mode))
+        with open(file_path, mode='ab') as file:
+            file.write(b' annotated')
+        self.assertEqual(b'content', cache.get('key'))
@@ -0,0 +1,236 @@
+import os
+import sys
+import json
+import tempfile
+import datetime
+import subprocess
+import unittest
+from unittest import mock
+
+from click.testing import CliRunner
+
+from harvest_kit_hiwi.util import get_version
+from harvest_kit_hiwi.config import CONFIG
+from harvest_kit_hiwi.harvest import HarvestApi
+from harvest_kit_hiwi.processing import TimeSpan
+from harvest_kit_hiwi.processing import ArbeitszeitData
+from harvest_kit_hiwi.archive import ArchiveIndex
+from harvest_kit_hiwi.cli import cli
+from harvest_kit_hiwi.cli import retrieve_time_spans
+
+from .util import MockHarvestServer
+from .util import create_time_entry
+from .util import create_test_config
+from .util import generate_time_entries
+
+# The commands which create documents depend on the cairo system library, which might not be available
+try:
+    import cairosvg
+except (ImportError, OSError):
+    cairosvg = None
+
+def load_archived(path: str) -> ArbeitszeitData:
+    with open(path) as file:
+        return ArbeitszeitData.from_dict(json.load(file))
+
+
+# Heavy libraries, which must not be imported just to start the command line
+HEAVY_MODULES = ['requests', 'cairosvg', 'svgutils', 'lxml', 'dateutil', 'yaml']
+
+
+class TestCliStartup(unittest.TestCase):
+
+    def test_version_flag(self):
+        result = CliRunner().invoke(cli, ['--version'])
+        self.assertEqual(0, result.exit_code)
+        self.assertEqual(get_version(), result.output.strip())
+
+    def test_heavy_modules_are_not_imported(self):
+        # This has to run in a fresh interpreter, since the test process has already imported everything
+        code = (
+            'import sys\n'
+            'from click.testing import CliRunner\n'
+            'from harvest_kit_hiwi.cli import cli\n'
+            'CliRunner().invoke(cli, ["--version"])\n'
+            'CliRunner().invoke(cli, ["azd", "--help"])\n'
+            f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n'
+        )
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual('', result.stdout.strip())
+
+
+class TestRetrieveTimeSpans(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.archive_path = os.path.join(self.temp_dir.name, 'azd_archive')
+
+        # An entry which was spent on the last day of October but only created on the first of November
+        entry = create_time_entry(2, datetime.datetime(2022, 11, 1, 9), 2)
+        entry['spent_date'] = '2022-10-31'
+        self.time_entries = [create_time_entry(1, datetime.datetime(2022, 10, 28, 9), 2), entry]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_entries_are_assigned_to_month_of_creation(self):
+        with MockHarvestServer(time_entries=self.time_entries) as server:
+            config = create_test_config(server.url)
+            api = HarvestApi(server.url, 'id', 'token')
+            for cache in (False, True):
+                october = retrieve_time_spans(api, config, '10', '2022', self.archive_path, cache=cache)
+                november = retrieve_time_spans(api, config, '11', '2022', self.archive_path, cache=cache)
+                self.assertEqual([datetime.date(2022, 10, 28)], [ts.start_datetime.date() for ts in october])
+                self.assertEqual([datetime.date(2022, 11, 1)], [ts.start_datetime.date() for ts in november])
+
+
+@unittest.skipIf(cairosvg is None, 'cairosvg is not available')
+class TestAzdRangeCommand(unittest.TestCase):
+
+    def setUp(self):
+        # The documents are written into the current working directory
+        self.cwd = os.getcwd()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.temp_dir.name)
+
+        # One entry per day from October to December, plus one for Sep 30 that was only created on Oct 1 and
+        # one for Dec 31 that was only created on Jan 1
+        self.time_entries = generate_time_entries(90, start=datetime.datetime(2022, 10, 3, 9))
+        for entry_id, start, spent_date in [(100, datetime.datetime(2022, 10, 1, 9), '2022-09-30'),
+                                            (101, datetime.datetime(2023, 1, 1, 9), '2022-12-31')]:
+            entry = create_time_entry(entry_id, start, 2.5)
+            entry['spent_date'] = spent_date
+            self.time_entries.append(entry)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+
+    def test_documents_are_created_for_every_month(self):
+        path = self.temp_dir.name
+        with MockHarvestServer(time_entries=self.time_entries) as server:
+            config = create_test_config(server.url)
+            config['function']['clip_overtime'] = False
+            with mock.patch.object(CONFIG, '_data', config.data), \
+                    mock.patch('harvest_kit_hiwi.cli.CACHE_PATH', os.path.join(path, 'cache')):
+                result = CliRunner().invoke(cli, ['azd-range', '10', '12', '--year', '2022', '--no-svg'])
+                self.assertEqual(0, result.exit_code, result.output)
+
+        files = sorted(os.listdir(path))
+        archive = {month: load_archived(os.path.join(path, 'azd_archive', f'2022_{month}.json'))
+                   for month in (10, 11, 12)}
+        self.assertEqual(['azd_10_2022.pdf', 'azd_11_2022.pdf', 'azd_12_2022.pdf', 'azd_archive', 'cache'], files)
+
+        # The entries belong to the month in which they were created
+        self.assertEqual([30, 30, 31], [len(archive[month].time_spans) for month in (10, 11, 12)])
+
+        # The carry over is passed on from one month to the next
+        self.assertEqual(0, archive[10].carry_over_before)
+        self.assertNotEqual(0, archive[10].carry_over_after)
+        self.assertAlmostEqual(archive[10].carry_over_after, archive[11].carry_over_before)
+        self.assertAlmostEqual(archive[11].carry_over_after, archive[12].carry_over_before)
+
+    def test_empty_range_exits_with_error(self):
+        result = CliRunner().invoke(cli, ['azd-range', '12', '10', '--year', '2022', '--no-svg'])
+        self.assertEqual(1, result.exit_code, result.output)
+        self.assertIn('does not contain any months', result.output)
+
+
+@unittest.skipIf(cairosvg is None, 'cairosvg is not available')
+class TestBatchCommand(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.roster_path = os.path.join(self.temp_dir.name, 'roster.yml')
+        # The second person only has a harvest user id, whose profile does not exist
+        with open(self.roster_path, mode='w') as file:
+            file.write('people:\n'
+                       '  - personal:\n'
+                       '      name: Max Mustermann\n'
+                       '    harvest:\n'
+                       '      user_id: 4018067\n'
+                       '  - 999\n')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_failure_of_one_person_is_isolated(self):
+        path = self.temp_dir.name
+        archive_path = os.path.join(path, 'azd_archive')
+        output_path = os.path.join(path, 'out')
+        time_entries = generate_time_entries(20, start=datetime.datetime(2022, 10, 3, 9))
+        with MockHarvestServer(time_entries=time_entries) as server:
+            config = create_test_config(server.url)
+            with mock.patch.object(CONFIG, '_data', config.data), \
+                    mock.patch('harvest_kit_hiwi.cli.CACHE_PATH', os.path.join(path, 'cache')):
+                result = CliRunner().invoke(cli, ['batch', self.roster_path, '10', '--year', '2022', '--no-svg',
+                                                  '-p', '1', '-a', archive_path, '-o', output_path])
+                self.assertEqual(1, result.exit_code, result.output)
+
+        self.assertIn('created 1 of 2 documents', result.output)
+        self.assertIn('[x] user_999', result.output)
+        self.assertEqual(['azd_10_2022_user_4018067.pdf'], os.listdir(output_path))
+
+        # Every person has their own sub folder in the archive
+        archived = load_archived(os.path.join(archive_path, 'user_4018067', '2022_10.json'))
+        self.assertEqual(20, len(archived.time_spans))
+        self.assertFalse(os.path.exists(os.path.join(archive_path, 'user_999')))
+
+
+class TestArchiveMigrateCommand(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.archive_path = os.path.join(self.temp_dir.name, 'azd_archive')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_archive_file(self, folder: str, month: int, year: int) -> None:
+        start = datetime.datetime(year, month, 3, 9)
+        azd_data = ArbeitszeitData(
+            time_spans=[TimeSpan(start, start + datetime.timedelta(hours=2), {'task'})],
+            name='Max Mustermann',
+            personnel_number='1982907',
+            institute='KIT',
+            working_hours=20,
+            hourly_rate=12.5,
+            carry_over=0,
+            leave=0,
+            month=month,
+            year=year,
+        )
+        folder_path = os.path.join(self.archive_path, folder)
+        os.makedirs(folder_path, exist_ok=True)
+        with open(os.path.join(folder_path, f'{year}_{month}.json'), mode='w') as file:
+            json.dump(azd_data.to_dict(), file)
+
+    def test_import_single_person(self):
+        self.write_archive_file('', 9, 2022)
+        self.write_archive_file('', 10, 2022)
+
+        result = CliRunner().invoke(cli, ['archive-migrate', '-a', self.archive_path, '--person', '1982907'])
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertIn('indexed 2 archive entries for 1982907', result.output)
+
+        index = ArchiveIndex(self.archive_path)
+        self.assertEqual(10, index.get('1982907', 10, 2022).month)
+        self.assertIsNone(index.get('1982907', 11, 2022))
+        index.close()
+
+    def test_import_batch_archive(self):
+        # The batch command creates one sub folder per person, named by the key of that person
+        self.write_archive_file('user_1', 10, 2022)
+        self.write_archive_file('user_2', 9, 2022)
+        self.write_archive_file('user_2', 10, 2022)
+
+        result = CliRunner().invoke(cli, ['archive-migrate', '-a', self.archive_path, '--batch'])
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertIn('indexed 1 archive entries for user_1', result.output)
+        self.assertIn('indexed 2 archive entries for user_2', result.output)
+
+        index = ArchiveIndex(self.archive_path)
+        self.assertIsNotNone(index.get('user_1', 10, 2022))
+        self.assertIsNone(index.get('user_1', 9, 2022))
+        self.assertIsNotNone(index.get('user_2', 9, 2022))
+        index.close()
@@ -1,9 +1,13 @@
 import unittest
 import os
+import tempfile
 
 from harvest_kit_hiwi.config import load_config
 from harvest_kit_hiwi.config import Config
 from harvest_kit_hiwi.config import CONFIG
+from harvest_kit_hiwi.config import ConfigData
+from harvest_kit_hiwi.config import merge_dicts
+from harvest_kit_hiwi.config import load_roster
 
 from .util import ASSETS_PATH
 from .util import LOGGER
@@ -45,3 +49,40 @@ class TestConfig(unittest.TestCase):
 
         value = config.is_harvest_configured()
         self.assertTrue(value)
+
+
+class TestConfigData(unittest.TestCase):
+
+    def test_merge_dicts(self):
+        base = {'a': {'b': 1, 'c': 2}, 'd': 3}
+        merged = merge_dicts(base, {'a': {'b': 10}, 'e': 4})
+        self.assertEqual({'a': {'b': 10, 'c': 2}, 'd': 3, 'e': 4}, merged)
+        # The original dict must not be modified
+        self.assertEqual(1, base['a']['b'])
+
+    def test_merged_config_is_independent(self):
+        config = ConfigData({'personal': {'name': 'Max', 'personnel_number': '1'}, 'harvest': {}})
+        other = config.merged({'personal': {'name': 'Erika'}})
+        self.assertEqual('Erika', other.get_name())
+        self.assertEqual('1', other.get_personnel_number())
+        self.assertEqual('Max', config.get_name())
+
+    def test_load_roster(self):
+        base = ConfigData({'personal': {'name': 'Max', 'personnel_number': '1'}, 'harvest': {}})
+        with tempfile.TemporaryDirectory() as path:
+            roster_path = os.path.join(path, 'roster.yml')
+            with open(roster_path, mode='w') as file:
+                file.write('people:\n'
+                           '  - personal:\n'
+                           '      name: Erika\n'
+                           '      personnel_number: "2"\n'
+                           '  - 4018067\n')
+
+            configs = load_roster(roster_path, base)
+
+        self.assertEqual(2, len(configs))
+        self.assertEqual('Erika', configs[0].get_name())
+        self.assertEqual('2', configs[0].get_key())
+        self.assertIsNone(configs[1].get_name())
+        self.assertEqual(4018067, configs[1].get_harvest_user_id())
+        self.assertEqual('user_4018067', configs[1].get_key())
@@ -1,5 +1,9 @@
 import os
 import json
+import time
+import asyncio
+import tempfile
+import datetime
 import unittest
 from pprint import pprint
 
@@ -7,10 +11,21 @@ import requests
 from dateutil import parser
 
 from harvest_kit_hiwi.config import CONFIG
+from harvest_kit_hiwi.cache import DiskCache
 from harvest_kit_hiwi.harvest import HarvestApi
+from harvest_kit_hiwi.harvest import TIME_ENTRY_FIELDS
+from harvest_kit_hiwi.harvest import compile_fields
+from harvest_kit_hiwi.harvest import project_fields
+from harvest_kit_hiwi.processing import TimeSpan
+from harvest_kit_hiwi.transport import RateLimiter
+from harvest_kit_hiwi.transport import AsyncRateLimiter
+from harvest_kit_hiwi.transport import TokenBucket
+from harvest_kit_hiwi.transport import get_retry_delay
 
 from .util import LOGGER
 from .util import ASSETS_PATH
+from .util import MockHarvestServer
+from .util import generate_time_entries
 
 
 HEADERS = {
@@ -107,3 +122,233 @@ class TestHarvestApi(unittest.TestCase):
 
         with open(self.time_entries_path, mode='w') as file:
             json.dump(time_entries, file)
+
+
+class TestHarvestApiOffline(unittest.TestCase):
+    """
+    These tests use a local stand-in for the Harvest API and can thus run without a harvest account.
+    """
+    project_id = '34329740'
+
+    def test_get_time_entries_paginates_through_all_entries(self):
+        time_entries = generate_time_entries(250)
+        with MockHarvestServer(time_entries=time_entries) as server:
+            api = HarvestApi(url=server.url, account_id='id', account_token='token')
+            result = api.get_time_entries(project_id=self.project_id)
+
+            self.assertEqual(3, len(server.requests))
+
+        self.assertEqual([te['id'] for te in time_entries], [te['id'] for te in result])
+
+    def test_requests_are_recorded_in_timings(self):
+        time_entries = generate_time_entries(250)
+        with MockHarvestServer(time_entries=time_entries) as server:
+            api = HarvestApi(url=server.url, account_id='id', account_token='token')
+            api.get_time_entries(project_id=self.project_id)
+
+        self.assertEqual(3, api.timings.counters['http_requests'])
+        self.assertGreater(api.timings.counters['http_bytes'], 0)
+        self.assertGreater(api.timings.stages['http'], 0)
+
+    def test_responses_are_compressed(self):
+        time_entries = generate_time_entries(250)
+        with MockHarvestServer(time_entries=time_entries) as server:
+            api = HarvestApi(url=server.url, account_id='id', account_token='token')
+            result = api.get_time_entries(project_id=self.project_id)
+            self.assertEqual(3, server.num_compressed)
+
+        self.assertEqual(time_entries, result)
+
+    def test_time_entry_fields_are_projected(self):
+        time_entries = generate_time_entries(150)
+        with MockHarvestServer(time_entries=time_entries) as server:
+            api = HarvestApi(url=server.url, account_id='id', account_token='token')
+            result = api.get_time_entries(project_id=self.project_id, fields=TIME_ENTRY_FIELDS)
+
+        self.assertEqual(150, len(result))
+        self.assertEqual({'name': 'task 0'}, result[0]['task'])
+        self.assertEqual({'id': 4018067}, result[0]['user'])
+        self.assertNotIn('name', result[0]['project'])
+        # The reduced entries still contain everything that is needed to create the time spans
+        for te, te_full in zip(result, time_entries):
+            ts = TimeSpan.from_time_entry(te)
+            ts_full = TimeSpan.from_time_entry(te_full)
+            self.assertEqual(ts_full.end_datetime, ts.end_datetime)
+            self.assertSetEqual(ts_full.description_set, ts.description_set)
+
+    def test_throttled_page_is_retried_on_its_own(self):
+        time_entries = generate_time_entries(250)
+        throttle = {('/time_entries', 2): 2}
+        with MockHarvestServer(time_entries=time_entries, throttle=throttle) as server:
+            api = HarvestApi(url=server.url, account_id='id', account_token='token', backoff=0)
+            result = api.get_time_entries(project_id=self.project_id)
+
+            # Only the second page had to be requested again
+            pages = [int(params['page']) for _, params in server.requests]
+            self.assertEqual([1, 2, 2, 2, 3], pages)
+
+        self.assertEqual([te['id'] for te in time_entries], [te['id'] for te in result])
+        self.assertEqual(2, api.timings.counters['http_retries'])
+
+    def test_exhausted_retries_raise(self):
+        throttle = {('/time_entries', 1): 5}
+        with MockHarvestServer(time_entries=generate_time_entries(10), throttle=throttle) as server:
+            api = HarvestApi(url=server.url, account_id='id', account_token='token', retries=2, backoff=0)
+            with self.assertRaises(requests.HTTPError):
+                api.get_time_entries(project_id=self.project_id)
+
+            self.assertEqual(3, len(server.requests))
+
+    def test_get_time_entries_date_window_is_passed_to_api(self):
+        time_entries = generate_time_entries(400, start=datetime.datetime(2022, 1, 1, 9))
+        with MockHarvestServer(time_entries=time_entries) as server:
+            api = HarvestApi(url=server.url, account_id='id', account_token='token')
+            result = api.get_time_entries(
+                project_id=self.project_id,
+                from_date=datetime.date(2022, 10, 1),
+                to_date=datetime.date(2022, 10, 31),
+            )
+
+            # The whole month fits onto one page which means that only a single request is necessary
+            self.assertEqual(1, len(server.requests))
+            _, params = server.requests[0]
+            self.assertEqual('2022-10-01', params['from'])
+            self.assertEqual('2022-10-31', params['to'])
+
+        self.assertEqual(31, len(result))
+        for te in result:
+            self.assertTrue(te['spent_date'].startswith('2022-10'))
+
+    def test_get_time_entries_concurrently_keeps_order(self):
+        time_entries = generate_time_entries(1000)
+        with MockHarvestServer(time_entries=time_entries, per_page=50) as server:
+            api = HarvestApi(url=server.url, account_id='id', account_token='token', workers=4)
+            result = api.get_time_entries(project_id=self.project_id)
+
+            self.assertEqual(20, len(server.requests))
+
+        self.assertEqual([te['id'] for te in time_entries], [te['id'] for te in result])
+
+    def test_get_projects_concurrently(self):
+        projects = [{'id': i, 'name': f'project {i}'} for i in range(30)]
+        with MockHarvestServer(projects=projects, per_page=7) as server:
+            api = HarvestApi(url=server.url, account_id='id', account_token='token', workers=3)
+            result = api.get_projects()
+
+        self.assertEqual(projects, result)
+
+    def test_http_cache_revalidates_with_etag(self):
+        time_entries = generate_time_entries(120)
+        with tempfile.TemporaryDirectory() as path, MockHarvestServer(time_entries=time_entries) as server:
+            cache = DiskCache(path)
+            api = HarvestApi(url=server.url, account_id='id', account_token='token', cache=cache)
+            result_first = api.get_time_entries(project_id=self.project_id)
+            self.assertNotEqual(0, cache.size)
+
+            # The second time around the server answers "not modified" and the content comes from the cache
+            api = HarvestApi(url=server.url, account_id='id', account_token='token', cache=cache)
+            response = api.session.get(api.time_entries_url, params={'project_id': self.project_id, 'page': 1})
+            self.assertTrue(response.from_cache)
+            result_second = api.get_time_entries(project_id=self.project_id)
+            self.assertEqual(result_first, result_second)
+
+    def test_http_cache_ttl_avoids_requests(self):
+        with tempfile.TemporaryDirectory() as path, MockHarvestServer() as server:
+            cache = DiskCache(path)
+            api = HarvestApi(url=server.url, account_id='id', account_token='token', cache=cache,
+                             cache_ttl=60)
+            projects = api.get_projects()
+            self.assertEqual(1, len(server.requests))
+
+            self.assertEqual(projects, api.get_projects())
+            self.assertEqual(1, len(server.requests))
+
+    def test_iter_time_entries_retrieves_pages_on_demand(self):
+        time_entries = generate_time_entries(250)
+        with MockHarvestServer(time_entries=time_entries) as server:
+            api = HarvestApi(url=server.url, account_id='id', account_token='token')
+            iterator = api.iter_time_entries(project_id=self.project_id)
+            self.assertEqual(0, len(server.requests))
+
+            # Consuming the first page worth of entries must not trigger the request of the second page
+            for _ in range(100):
+                next(iterator)
+            self.assertEqual(1, len(server.requests))
+
+            self.assertEqual(150, len(list(iterator)))
+            self.assertEqual(3, len(server.requests))
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_requests_within_budget_do_not_block(self):
+        limiter = RateLimiter(max_requests=10, period=60)
+        start = time.monotonic()
+        for _ in range(10):
+            limiter.acquire()
+
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_exceeding_budget_blocks_until_window_expires(self):
+        limiter = RateLimiter(max_requests=2, period=0.2)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.acquire()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+    def test_token_bucket_refills_continuously(self):
+        bucket = TokenBucket(max_requests=2, period=0.2)
+        start = time.monotonic()
+        for _ in range(4):
+            bucket.acquire()
+
+        # After the burst of two requests, one token is refilled every 0.1 seconds
+        elapsed = time.monotonic() - start
+        self.assertGreaterEqual(elapsed, 0.18)
+        self.assertLess(elapsed, 0.5)
+
+    def test_retry_delay(self):
+        response = requests.Response()
+        response.headers['Retry-After'] = '7'
+        self.assertEqual(7, get_retry_delay(response, 0))
+
+        # Without a Retry-After header, the delay grows exponentially
+        self.assertEqual([1, 2, 4], [get_retry_delay(None, attempt, backoff=1) for attempt in range(3)])
+        self.assertEqual(60, get_retry_delay(None, 20, backoff=1))
+
+    def test_async_limiter_waits_without_blocking_the_loop(self):
+        limiter = AsyncRateLimiter(max_requests=2, period=0.2)
+        ticks = []
+
+        async def acquire_all():
+            for _ in range(3):
+                await limiter.acquire()
+
+        async def tick():
+            # This keeps running while the other coroutine waits for the rate limit
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.02)
+
+        async def main():
+            await asyncio.gather(acquire_all(), tick())
+
+        start = time.monotonic()
+        asyncio.run(main())
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertEqual(5, len(ticks))
+
+
+class TestFieldProjection(unittest.TestCase):
+
+    def test_compile_fields(self):
+        tree = compile_fields(['id', 'task.name', 'task.id', 'user', 'user.name'])
+        self.assertEqual({'id': None, 'task': {'name': None, 'id': None}, 'user': None}, tree)
+        # A whole value which is listed after some of its sub fields replaces them
+        self.assertEqual({'task': None}, compile_fields(['task.name', 'task']))
+
+    def test_project_fields(self):
+        item = {'id': 1, 'hours': 2.0, 'task': {'id': 3, 'name': 'task'}, 'notes': None}
+        tree = compile_fields(['id', 'task.name', 'missing', 'missing.field'])
+        self.assertEqual({'id': 1, 'task': {'name': 'task'}}, project_fields(item, tree))
@@ -4,9 +4,15 @@ import os
 import json
 
 from harvest_kit_hiwi.processing import TimeSpan
+from harvest_kit_hiwi.processing import iter_time_spans
+from harvest_kit_hiwi.processing import clip_time_spans
+from harvest_kit_hiwi.processing import merge_daily
+from harvest_kit_hiwi.processing import parse_timestamp
+from harvest_kit_hiwi.processing import partition_by_month
 
 from .util import ASSETS_PATH
 from .util import LOGGER
+from .util import generate_time_entries
 
 
 class TestTimeSpan(unittest.TestCase):
@@ -37,6 +43,25 @@ class TestTimeSpan(unittest.TestCase):
             ts = TimeSpan.from_time_entry(te)
             self.assertIsInstance(ts, TimeSpan)
 
+    def test_constructing_from_time_entries_works(self):
+        time_spans = TimeSpan.from_time_entries(self.time_entries)
+        self.assertEqual(len(self.time_entries), len(time_spans))
+        for te, ts in zip(self.time_entries, time_spans):
+            expected = TimeSpan.from_time_entry(te)
+            self.assertEqual(expected.start_datetime, ts.start_datetime)
+            self.assertEqual(expected.end_datetime, ts.end_datetime)
+            self.assertSetEqual(expected.description_set, ts.description_set)
+
+    def test_parse_timestamp_works(self):
+        utc = datetime.timezone.utc
+        self.assertEqual(datetime.datetime(2022, 10, 4, 9, 12, 43, tzinfo=utc),
+                         parse_timestamp('2022-10-04T09:12:43Z'))
+        self.assertEqual(datetime.datetime(2022, 10, 4, 9, 12, 43, tzinfo=utc),
+                         parse_timestamp('2022-10-04T09:12:43+00:00'))
+        # Formats which are not ISO 8601 are still understood by the fallback parser
+        self.assertEqual(datetime.datetime(2022, 10, 4, 9, 12),
+                         parse_timestamp('October 4, 2022 9:12'))
+
     def test_collision_detection_works(self):
         td_1 = datetime.timedelta(hours=1)
         td_2 = datetime.timedelta(hours=2)
@@ -86,5 +111,140 @@ class TestTimeSpan(unittest.TestCase):
         self.assertIsInstance(td_sum, TimeSpan)
         self.assertEqual(3, td_sum.duration)
 
-
-
+    def test_time_span_has_no_instance_dict(self):
+        ts_1 = TimeSpan(datetime.datetime.now(), datetime.datetime.now())
+        self.assertFalse(hasattr(ts_1, '__dict__'))
+        # The default description set must not be shared between instances
+        ts_1.description_set.add('hello')
+        ts_2 = TimeSpan(datetime.datetime.now(), datetime.datetime.now())
+        self.assertSetEqual(set(), ts_2.description_set)
+
+
+class TestIterTimeSpans(unittest.TestCase):
+
+    def test_converts_lazily(self):
+        time_entries = iter(generate_time_entries(10))
+        time_spans = iter_time_spans(time_entries)
+        ts = next(time_spans)
+        self.assertIsInstance(ts, TimeSpan)
+        # Only the first entry should have been consumed so far
+        self.assertEqual(9, len(list(time_entries)))
+
+    def test_month_filter_respects_year(self):
+        # 380 days starting in january 2022 cover all of january 2022 and half of january 2023
+        time_entries = generate_time_entries(380, start=datetime.datetime(2022, 1, 1, 9))
+        time_spans = list(iter_time_spans(time_entries, month=1, year=2022))
+        self.assertEqual(31, len(time_spans))
+        for ts in time_spans:
+            self.assertEqual((1, 2022), (ts.start_datetime.month, ts.start_datetime.year))
+
+        # Strings, like they come from the command line, should work as well
+        time_spans = list(iter_time_spans(time_entries, month='1', year='2023'))
+        self.assertEqual(15, len(time_spans))
+
+
+class TestClipTimeSpans(unittest.TestCase):
+
+    def setUp(self):
+        # 10 entries of 2.5 hours each make 25 hours in total
+        self.time_spans = list(iter_time_spans(generate_time_entries(10)))
+
+    def test_overtime_is_clipped_proportionally(self):
+        time_spans, carry_over = clip_time_spans(self.time_spans, working_hours=24, leave=4)
+        self.assertEqual(25 * 3600, carry_over.total_seconds)
+        self.assertEqual(20 * 3600, carry_over.due_seconds)
+        self.assertEqual(5 * 3600, carry_over.overtime_seconds)
+        self.assertTrue(carry_over.clipped)
+
+        total_seconds = sum(ts.time_delta.total_seconds() for ts in time_spans)
+        self.assertAlmostEqual(20 * 3600, total_seconds)
+        for ts, ts_original in zip(time_spans, self.time_spans):
+            self.assertEqual(ts_original.start_datetime, ts.start_datetime)
+            self.assertAlmostEqual(2.0, ts.duration)
+            # The original time spans are not modified
+            self.assertAlmostEqual(2.5, ts_original.duration)
+
+    def test_missing_time_is_not_clipped(self):
+        time_spans, carry_over = clip_time_spans(self.time_spans, working_hours=30)
+        self.assertFalse(carry_over.clipped)
+        self.assertEqual(5 * 3600, carry_over.carry_over_seconds)
+        self.assertEqual([ts.duration for ts in self.time_spans], [ts.duration for ts in time_spans])
+
+    def test_clipping_can_be_disabled(self):
+        time_spans, carry_over = clip_time_spans(self.time_spans, working_hours=20, clip=False)
+        self.assertFalse(carry_over.clipped)
+        self.assertEqual(-5 * 3600, carry_over.carry_over_seconds)
+        self.assertAlmostEqual(25, sum(ts.duration for ts in time_spans))
+
+    def test_empty_time_spans(self):
+        time_spans, carry_over = clip_time_spans([], working_hours=20)
+        self.assertEqual([], time_spans)
+        self.assertEqual(20 * 3600, carry_over.carry_over_seconds)
+
+
+class TestPartitionByMonth(unittest.TestCase):
+
+    def test_partitions_by_month_and_year(self):
+        time_entries = generate_time_entries(400, start=datetime.datetime(2022, 1, 1, 9))
+        partitions = partition_by_month(TimeSpan.from_time_entries(time_entries))
+
+        # 400 days starting on 2022-01-01 end on 2023-02-04
+        self.assertEqual(14, len(partitions))
+        self.assertEqual(31, len(partitions[(1, 2022)]))
+        self.assertEqual(4, len(partitions[(2, 2023)]))
+        self.assertEqual(400, sum(len(time_spans) for time_spans in partitions.values()))
+        for (month, year), time_spans in partitions.items():
+            for ts in time_spans:
+                self.assertEqual((month, year), (ts.start_datetime.month, ts.start_datetime.year))
+
+
+class TestMergeDaily(unittest.TestCase):
+
+    def test_merges_by_full_date(self):
+        # The same day of two different months must not be merged together
+        time_entries = generate_time_entries(1, start=datetime.datetime(2022, 1, 5, 9), hours=2)
+        time_entries += generate_time_entries(1, start=datetime.datetime(2022, 2, 5, 9), hours=1)
+        time_entries += generate_time_entries(1, start=datetime.datetime(2022, 1, 5, 8), hours=1.5)
+        time_spans = list(iter_time_spans(time_entries))
+
+        merged = merge_daily(time_spans)
+        self.assertEqual(2, len(merged))
+        self.assertEqual(datetime.date(2022, 1, 5), merged[0].start_datetime.date())
+        self.assertEqual(8, merged[0].start_datetime.hour)
+        self.assertAlmostEqual(3.5, merged[0].duration)
+        self.assertEqual(datetime.date(2022, 2, 5), merged[1].start_datetime.date())
+        self.assertAlmostEqual(1, merged[1].duration)
+
+    def test_matches_pairwise_merge(self):
+        time_entries = generate_time_entries(20, hours=2)
+        time_entries += generate_time_entries(20, hours=1.25)
+        time_spans = list(iter_time_spans(time_entries))
+
+        merged = merge_daily(time_spans)
+        self.assertEqual(20, len(merged))
+        for ts in merged:
+            same_day = sorted([t for t in time_spans if t.start_datetime.date() == ts.start_datetime.date()],
+                              key=lambda t: t.start_datetime)
+            expected = sum(same_day[1:], same_day[0])
+            self.assertEqual(expected.start_datetime, ts.start_datetime)
+            self.assertEqual(expected.end_datetime, ts.end_datetime)
+            self.assertSetEqual(expected.description_set, ts.description_set)
+
+    def test_week_granularity(self):
+        # 2022-01-03 is a monday, so 14 consecutive days are exactly two calendar weeks
+        time_spans = list(iter_time_spans(generate_time_entries(14, hours=1)))
+        merged = merge_daily(time_spans, granularity='week')
+        self.assertEqual(2, len(merged))
+        self.assertEqual([7, 7], [ts.duration for ts in merged])
+
+        with self.assertRaises(ValueError):
+            merge_daily(time_spans, granularity='year')
+
+    def test_week_longer_than_a_day(self):
+        # Four days with 8 hours each add up to a single time span of 32 hours
+        time_spans = list(iter_time_spans(generate_time_entries(4, hours=8)))
+        merged = merge_daily(time_spans, granularity='week')
+        self.assertEqual(1, len(merged))
+        self.assertEqual(32, merged[0].duration)
+        self.assertEqual(datetime.timedelta(hours=32), merged[0].time_delta)
+        self.assertEqual(40, merged[0].merge(time_spans[0]).duration)
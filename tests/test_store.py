@@ -0,0 +1,113 @@
+import os
+import json
+import sqlite3
+import tempfile
+import unittest
+
+from harvest_kit_hiwi.harvest import HarvestApi
+from harvest_kit_hiwi.store import TimeEntryStore
+
+from .util import MockHarvestServer
+from .util import generate_time_entries
+
+
+class TestTimeEntryStore(unittest.TestCase):
+
+    project_id = '34329740'
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = TimeEntryStore.from_archive(os.path.join(self.temp_dir.name, 'azd_archive'))
+
+    def tearDown(self) -> None:
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_construction_basically_works(self):
+        self.assertIsInstance(self.store, TimeEntryStore)
+        self.assertTrue(os.path.exists(self.store.path))
+        self.assertIsNone(self.store.get_updated_since(self.project_id))
+        self.assertEqual([], self.store.get_time_entries(self.project_id))
+
+    def test_sync_is_incremental(self):
+        time_entries = generate_time_entries(150)
+        with MockHarvestServer(time_entries=time_entries) as server:
+            api = HarvestApi(url=server.url, account_id='id', account_token='token')
+
+            # The first sync has to retrieve everything
+            num = self.store.sync(api, self.project_id)
+            self.assertEqual(150, num)
+            self.assertNotIn('updated_since', server.requests[0][1])
+            self.assertEqual(150, len(self.store.get_time_entries(self.project_id)))
+
+            # After one entry was modified, only that one (and the boundary entry with the most recent
+            # timestamp) should be retrieved
+            time_entries[3]['hours'] = 10
+            time_entries[3]['updated_at'] = '2023-01-01T00:00:00Z'
+            server.requests.clear()
+            num = self.store.sync(api, self.project_id)
+            self.assertEqual(1, len(server.requests))
+            self.assertIn('updated_since', server.requests[0][1])
+            self.assertLessEqual(num, 2)
+
+        stored = {te['id']: te for te in self.store.get_time_entries(self.project_id)}
+        self.assertEqual(10, stored[time_entries[3]['id']]['hours'])
+
+    def test_full_sync_marks_deleted_entries(self):
+        time_entries = generate_time_entries(20)
+        with MockHarvestServer(time_entries=time_entries) as server:
+            api = HarvestApi(url=server.url, account_id='id', account_token='token')
+            self.store.sync(api, self.project_id)
+
+            deleted = server.time_entries.pop(5)
+            self.store.sync(api, self.project_id, full=True)
+
+        ids = [te['id'] for te in self.store.get_time_entries(self.project_id)]
+        self.assertEqual(19, len(ids))
+        self.assertNotIn(deleted['id'], ids)
+
+    def test_get_time_entries_date_window(self):
+        self.store.update(self.project_id, generate_time_entries(100))
+        time_entries = self.store.get_time_entries(self.project_id, '2022-02-01', '2022-02-28')
+        self.assertEqual(28, len(time_entries))
+
+    def test_get_time_entries_by_creation_date(self):
+        # An entry for the last day of February which was only created on the first of March
+        time_entries = generate_time_entries(100)
+        time_entries[57]['spent_date'] = '2022-02-28'
+        self.store.update(self.project_id, time_entries)
+
+        time_entries = self.store.get_time_entries(self.project_id, '2022-02-01', '2022-02-28')
+        self.assertEqual(29, len(time_entries))
+        time_entries = self.store.get_time_entries(self.project_id, '2022-03-01', '2022-03-31', by='created_at')
+        self.assertEqual(31, len(time_entries))
+        self.assertIn(58, [te['id'] for te in time_entries])
+
+    def test_creation_date_uses_index(self):
+        plan = self.store.connection.execute(
+            'EXPLAIN QUERY PLAN SELECT data FROM time_entries '
+            'WHERE project_id = ? AND deleted = 0 AND created_at >= ? AND created_at < ?',
+            (self.project_id, '2022-03-01', '2022-04-01')
+        ).fetchall()
+        self.assertIn('time_entries_created', ' '.join(row[-1] for row in plan))
+
+    def test_store_without_creation_column_is_migrated(self):
+        path = os.path.join(self.temp_dir.name, 'old.sqlite')
+        connection = sqlite3.connect(path)
+        with connection:
+            connection.execute(
+                'CREATE TABLE time_entries (id INTEGER PRIMARY KEY, project_id TEXT NOT NULL, '
+                'spent_date TEXT NOT NULL, updated_at TEXT NOT NULL, deleted INTEGER NOT NULL DEFAULT 0, '
+                'data TEXT NOT NULL)'
+            )
+            connection.executemany(
+                'INSERT INTO time_entries (id, project_id, spent_date, updated_at, data) VALUES (?, ?, ?, ?, ?)',
+                [(te['id'], self.project_id, te['spent_date'], te['updated_at'], json.dumps(te))
+                 for te in generate_time_entries(100)]
+            )
+        connection.close()
+
+        store = TimeEntryStore(path)
+        time_entries = store.get_time_entries(self.project_id, '2022-03-01', '2022-03-31', by='created_at')
+        store.close()
+        self.assertEqual(31, len(time_entries))
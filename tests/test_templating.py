@@ -1,13 +1,54 @@
+import io
 import unittest
 import os
+import datetime
+import tempfile
+from unittest import mock
 from collections import namedtuple
 
 import cairosvg
 import svgutils.transform as sg
+from lxml import etree
+
+from harvest_kit_hiwi.processing import TimeSpan, ArbeitszeitData
+from harvest_kit_hiwi.util import TEMPLATE_PATH
+from harvest_kit_hiwi.cache import DiskCache
+from harvest_kit_hiwi.timing import Timings
+from harvest_kit_hiwi.document import AzdTemplate
+from harvest_kit_hiwi.document import AzdStringTemplate
+from harvest_kit_hiwi.document import RenderJob
+from harvest_kit_hiwi.document import create_azd_svg
+from harvest_kit_hiwi.document import create_azd_pdf
+from harvest_kit_hiwi.document import create_azd_text_layer
+from harvest_kit_hiwi.document import create_azd_text_string
+from harvest_kit_hiwi.document import merge_pdf
+from harvest_kit_hiwi.document import pypdf
+from harvest_kit_hiwi.document import render_azd_documents
+from harvest_kit_hiwi.document import render_job
+from harvest_kit_hiwi.document import render_key
 
 from .util import ASSETS_PATH
 
 
+def create_azd_data(month: int = 10, num: int = 10) -> ArbeitszeitData:
+    start = datetime.datetime(2022, month, 1, 9)
+    time_spans = [TimeSpan(start + datetime.timedelta(days=i), start + datetime.timedelta(days=i, hours=2),
+                           {f'task {i}'})
+                  for i in range(num)]
+    return ArbeitszeitData(
+        time_spans=time_spans,
+        name='Max Mustermann',
+        personnel_number='1982907',
+        institute='KIT',
+        working_hours=20,
+        hourly_rate=12.5,
+        carry_over=0,
+        leave=4,
+        month=month,
+        year=2022,
+    )
+
+
 class Size:
 
     def __init__(self, value):
@@ -108,3 +149,220 @@ class TestSvgManipulation(unittest.TestCase):
 
         self.assertTrue(os.path.exists(self.pdf_path))
 
+
+class TestRenderAzdDocuments(unittest.TestCase):
+
+    def test_render_multiple_documents_in_parallel(self):
+        with tempfile.TemporaryDirectory() as path:
+            jobs = [RenderJob(azd_data=create_azd_data(month),
+                              svg_path=os.path.join(path, f'{month}.svg'),
+                              pdf_path=os.path.join(path, f'{month}.pdf'))
+                    for month in range(1, 5)]
+            results = list(render_azd_documents(jobs, workers=2))
+
+            # The results have to be in the same order as the jobs
+            self.assertEqual([job.pdf_path for job in jobs], [job.pdf_path for job, _ in results])
+            for job, error in results:
+                self.assertIsNone(error)
+                self.assertTrue(os.path.exists(job.svg_path))
+                self.assertTrue(os.path.exists(job.pdf_path))
+
+    def test_failing_job_does_not_affect_others(self):
+        with tempfile.TemporaryDirectory() as path:
+            jobs = [
+                RenderJob(create_azd_data(), os.path.join(path, 'missing', 'a.svg'), os.path.join(path, 'a.pdf')),
+                RenderJob(create_azd_data(), os.path.join(path, 'b.svg'), os.path.join(path, 'b.pdf')),
+            ]
+            results = list(render_azd_documents(jobs, workers=1))
+            self.assertIsNotNone(results[0][1])
+            self.assertIsNone(results[1][1])
+
+    def test_render_pdf_only(self):
+        with tempfile.TemporaryDirectory() as path:
+            jobs = [RenderJob(create_azd_data(), None, os.path.join(path, 'a.pdf'))]
+            results = list(render_azd_documents(jobs, workers=1))
+            self.assertIsNone(results[0][1])
+            self.assertEqual(['a.pdf'], os.listdir(path))
+
+
+class TestCreateAzdPdf(unittest.TestCase):
+
+    def test_svg_file_is_optional(self):
+        with tempfile.TemporaryDirectory() as path:
+            pdf_path = os.path.join(path, 'out.pdf')
+            svg_content = create_azd_pdf(create_azd_data(), pdf_path)
+            self.assertEqual(['out.pdf'], os.listdir(path))
+            self.assertIn(b'Max Mustermann', svg_content)
+
+            svg_path = os.path.join(path, 'out.svg')
+            create_azd_pdf(create_azd_data(), pdf_path, svg_path=svg_path)
+            with open(svg_path, mode='rb') as file:
+                self.assertEqual(svg_content, file.read())
+
+
+@unittest.skipIf(pypdf is None, 'The optional dependency pypdf is not installed')
+class TestOverlayRendering(unittest.TestCase):
+
+    def create_pdf(self, width: float = 595.32, height: float = 841.92) -> bytes:
+        writer = pypdf.PdfWriter()
+        writer.add_blank_page(width=width, height=height)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        return buffer.getvalue()
+
+    def test_merge_pdf(self):
+        content = merge_pdf(self.create_pdf(), self.create_pdf())
+        reader = pypdf.PdfReader(io.BytesIO(content))
+        self.assertEqual(1, len(reader.pages))
+        self.assertAlmostEqual(595.32, float(reader.pages[0].mediabox.width), places=1)
+
+    def test_overlay_mode_caches_background(self):
+        with tempfile.TemporaryDirectory() as path:
+            cache = DiskCache(os.path.join(path, 'cache'))
+            pdf_path = os.path.join(path, 'out.pdf')
+            create_azd_pdf(create_azd_data(), pdf_path, overlay=True, cache=cache)
+            self.assertTrue(os.path.exists(pdf_path))
+
+            template = AzdTemplate.load(TEMPLATE_PATH)
+            self.assertTrue(cache.contains(f'background_{template.hash}'))
+
+            reader = pypdf.PdfReader(pdf_path)
+            self.assertEqual(1, len(reader.pages))
+            self.assertIn('Mustermann', reader.pages[0].extract_text())
+
+
+class TestAzdTemplate(unittest.TestCase):
+
+    def test_load_is_cached(self):
+        template = AzdTemplate.load(TEMPLATE_PATH)
+        self.assertIsInstance(template, AzdTemplate)
+        self.assertIs(template, AzdTemplate.load(TEMPLATE_PATH))
+
+    def test_load_picks_up_modifications(self):
+        with tempfile.TemporaryDirectory() as path:
+            template_path = os.path.join(path, 'template.svg')
+            with open(TEMPLATE_PATH, mode='rb') as source, open(template_path, mode='wb') as file:
+                file.write(source.read())
+
+            template = AzdTemplate.load(template_path)
+            os.utime(template_path, (0, 0))
+            self.assertIsNot(template, AzdTemplate.load(template_path))
+
+    def test_overlay_only_contains_layer(self):
+        template = AzdTemplate.load(TEMPLATE_PATH)
+        content = template.overlay(create_azd_text_layer(create_azd_data()))
+        self.assertIn(b'Max Mustermann', content)
+        self.assertIn(template.figure.root.get('viewBox').encode(), content)
+        self.assertLess(len(content), len(template.figure.to_str()) / 10)
+
+    def test_stamp_does_not_modify_template(self):
+        template = AzdTemplate.load(TEMPLATE_PATH)
+        before = template.figure.to_str()
+
+        content = template.stamp(create_azd_text_layer(create_azd_data()))
+        self.assertIn(b'Max Mustermann', content)
+        self.assertEqual(before, template.figure.to_str())
+
+    def test_create_azd_svg_with_template(self):
+        template = AzdTemplate.load(TEMPLATE_PATH)
+        with tempfile.TemporaryDirectory() as path:
+            svg_path = os.path.join(path, 'out.svg')
+            fig = create_azd_svg(create_azd_data(), svg_path, template=template)
+            self.assertTrue(os.path.exists(svg_path))
+
+        # The figure is a copy and appending to it must not affect the template
+        self.assertIsNot(fig.root, template.figure.root)
+        self.assertNotIn(b'Max Mustermann', template.figure.to_str())
+
+
+class TestAzdStringTemplate(unittest.TestCase):
+
+    def get_texts(self, content: bytes) -> list:
+        # svgutils re-indents the template when serializing it, which only changes the whitespace
+        root = etree.fromstring(content)
+        return [(element.get('x'), element.get('y'), (element.text or '').strip())
+                for element in root.iter('{http://www.w3.org/2000/svg}text')]
+
+    def test_text_string_matches_text_layer(self):
+        azd_data = create_azd_data()
+        layer = create_azd_text_layer(azd_data)
+        expected = [(element.get('x'), element.get('y'), element.text) for element in layer.root.iter()
+                    if element.tag.endswith('text')]
+
+        content = create_azd_text_string(azd_data)
+        root = etree.fromstring(content)
+        self.assertEqual(expected, [(element.get('x'), element.get('y'), element.text)
+                                    for element in root.iter('text')])
+
+    def test_text_string_escapes_markup(self):
+        azd_data = create_azd_data(num=1)
+        azd_data.time_spans[0].description_set = {'<fix> & test'}
+        root = etree.fromstring(create_azd_text_string(azd_data))
+        self.assertIn('<fix> & test', [element.text for element in root.iter('text')])
+
+    def test_stamp_produces_same_document_as_svgutils(self):
+        azd_data = create_azd_data()
+        content = AzdStringTemplate.load(TEMPLATE_PATH).stamp(create_azd_text_string(azd_data))
+        expected = AzdTemplate.load(TEMPLATE_PATH).stamp(create_azd_text_layer(azd_data))
+        self.assertEqual(self.get_texts(expected), self.get_texts(content))
+
+    def test_overlay_only_contains_layer(self):
+        template = AzdStringTemplate.load(TEMPLATE_PATH)
+        content = template.overlay(create_azd_text_string(create_azd_data()))
+        root = etree.fromstring(content)
+        self.assertEqual(AzdTemplate.load(TEMPLATE_PATH).figure.root.get('viewBox'), root.get('viewBox'))
+        self.assertIn('Max Mustermann', [text for _, _, text in self.get_texts(content)])
+
+    def test_create_azd_pdf_with_string_engine(self):
+        with tempfile.TemporaryDirectory() as path:
+            pdf_path = os.path.join(path, 'out.pdf')
+            svg_content = create_azd_pdf(create_azd_data(), pdf_path, engine='string')
+            self.assertTrue(os.path.exists(pdf_path))
+            self.assertIn(b'Max Mustermann', svg_content)
+
+
+class TestOutputCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_cache = DiskCache(os.path.join(self.temp_dir.name, 'cache'))
+        self.pdf_path = os.path.join(self.temp_dir.name, 'out.pdf')
+        self.svg_path = os.path.join(self.temp_dir.name, 'out.svg')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def create_job(self, azd_data: ArbeitszeitData, force: bool = False) -> RenderJob:
+        return RenderJob(azd_data, self.svg_path, self.pdf_path, output_cache=self.output_cache, force=force)
+
+    def test_render_key(self):
+        template_hash = AzdTemplate.load(TEMPLATE_PATH).hash
+        key = render_key(create_azd_data(), template_hash)
+        self.assertEqual(key, render_key(create_azd_data(), template_hash))
+        self.assertNotEqual(key, render_key(create_azd_data(num=5), template_hash))
+        self.assertNotEqual(key, render_key(create_azd_data(), 'other'))
+        self.assertNotEqual(key, render_key(create_azd_data(), template_hash, engine='string'))
+
+    def test_unchanged_document_is_not_rendered_again(self):
+        render_job(self.create_job(create_azd_data()))
+        with open(self.pdf_path, mode='rb') as file:
+            pdf_content = file.read()
+        os.remove(self.pdf_path)
+        os.remove(self.svg_path)
+
+        timings = Timings()
+        with mock.patch('harvest_kit_hiwi.document.render_azd_content') as render_mock:
+            render_job(self.create_job(create_azd_data()), timings=timings)
+            render_mock.assert_not_called()
+
+        self.assertEqual(1, timings.counters['documents_cached'])
+        with open(self.pdf_path, mode='rb') as file:
+            self.assertEqual(pdf_content, file.read())
+        self.assertTrue(os.path.exists(self.svg_path))
+
+    def test_changed_document_and_force_are_rendered(self):
+        render_job(self.create_job(create_azd_data()))
+        with mock.patch('harvest_kit_hiwi.document.render_azd_content', return_value=(b'', b'')) as render_mock:
+            render_job(self.create_job(create_azd_data(num=5)))
+            render_job(self.create_job(create_azd_data(), force=True))
+            self.assertEqual(2, render_mock.call_count)
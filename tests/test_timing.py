@@ -0,0 +1,45 @@
+import os
+import time
+import pstats
+import tempfile
+import unittest
+
+from harvest_kit_hiwi.timing import Timings
+from harvest_kit_hiwi.timing import stage
+from harvest_kit_hiwi.timing import profiled
+
+
+class TestTimings(unittest.TestCase):
+
+    def test_stages_and_counters_are_accumulated(self):
+        timings = Timings()
+        for _ in range(2):
+            with timings.stage('sleep'):
+                time.sleep(0.01)
+            timings.count('calls')
+        timings.count('bytes', 100)
+
+        self.assertGreaterEqual(timings.stages['sleep'], 0.02)
+        self.assertEqual({'calls': 2, 'bytes': 100}, timings.counters)
+        self.assertEqual(3, len(timings.report().split('\n')))
+
+    def test_optional_stage(self):
+        # Without timings the stage does nothing, but the block is still executed
+        with stage(None, 'nothing'):
+            value = 1
+        self.assertEqual(1, value)
+
+        timings = Timings()
+        with stage(timings, 'something'):
+            pass
+        self.assertIn('something', timings.stages)
+
+    def test_profiled_writes_stats(self):
+        with tempfile.TemporaryDirectory() as path:
+            profile_path = os.path.join(path, 'profile.out')
+            with profiled(profile_path):
+                sorted(range(1000), key=lambda x: -x)
+
+            self.assertTrue(os.path.exists(profile_path))
+            stats = pstats.Stats(profile_path)
+            self.assertGreater(stats.total_calls, 0)
@@ -1,10 +1,17 @@
 import unittest
 import os
+import stat
+import datetime
+import tempfile
 
 from decouple import config
 
 from harvest_kit_hiwi.util import VERSION_PATH
 from harvest_kit_hiwi.util import get_version
+from harvest_kit_hiwi.util import month_date_range
+from harvest_kit_hiwi.util import atomic_write
+from harvest_kit_hiwi.util import previous_month
+from harvest_kit_hiwi.util import iter_months
 
 from .util import LOGGER
 
@@ -18,3 +25,45 @@ class TestUtilFunctions(unittest.TestCase):
         version = get_version()
         self.assertIsInstance(version, str)
         self.assertNotEqual(0, len(version))
+
+    def test_month_date_range(self):
+        first, last = month_date_range(2, 2024)
+        self.assertEqual(datetime.date(2024, 2, 1), first)
+        self.assertEqual(datetime.date(2024, 2, 29), last)
+
+        # String arguments, like the ones from the command line, should work as well
+        first, last = month_date_range('12', '2022')
+        self.assertEqual(datetime.date(2022, 12, 1), first)
+        self.assertEqual(datetime.date(2022, 12, 31), last)
+
+    def test_atomic_write(self):
+        with tempfile.TemporaryDirectory() as path:
+            file_path = os.path.join(path, 'file.txt')
+            atomic_write(file_path, 'hello')
+            atomic_write(file_path, b'world')
+            with open(file_path) as file:
+                self.assertEqual('world', file.read())
+
+            # No temporary files should be left behind
+            self.assertEqual(['file.txt'], os.listdir(path))
+
+    def test_atomic_write_uses_default_permissions(self):
+        with tempfile.TemporaryDirectory() as path:
+            regular_path = os.path.join(path, 'regular.txt')
+            with open(regular_path, mode='w') as file:
+                file.write('hello')
+
+            file_path = os.path.join(path, 'file.txt')
+            atomic_write(file_path, 'hello')
+            self.assertEqual(stat.S_IMODE(os.stat(regular_path).st_mode),
+                             stat.S_IMODE(os.stat(file_path).st_mode))
+
+    def test_previous_month(self):
+        self.assertEqual((9, 2022), previous_month(10, 2022))
+        self.assertEqual((12, 2021), previous_month('1', '2022'))
+
+    def test_iter_months(self):
+        months = list(iter_months(11, 2022, 2, 2023))
+        self.assertEqual([(11, 2022), (12, 2022), (1, 2023), (2, 2023)], months)
+        self.assertEqual(12, len(list(iter_months('1', '2022', '12', '2022'))))
+        self.assertEqual([], list(iter_months(3, 2022, 2, 2022)))
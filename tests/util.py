@@ -1,11 +1,24 @@
 import os
 import sys
+import gzip
+import json
+import math
+import hashlib
 import pathlib
 import logging
+import datetime
+import threading
+import http.server
+import urllib.parse
+from typing import List, Optional, Tuple, Dict
 
 from decouple import AutoConfig
 
 from harvest_kit_hiwi.config import CONFIG
+from harvest_kit_hiwi.config import PATH as PACKAGE_PATH
+from harvest_kit_hiwi.config import ConfigData
+from harvest_kit_hiwi.config import load_config
+from harvest_kit_hiwi.config import merge_dicts
 
 PATH = pathlib.Path(__file__).parent.absolute()
 ASSETS_PATH = os.path.join(PATH, 'assets')
@@ -18,3 +31,204 @@ LOGGER.addHandler(logging.StreamHandler(sys.stdout))
 config = AutoConfig(PATH)
 config_path = config('HARVEST_HIWI_CONFIG')
 CONFIG.load(config_path)
+
+
+def create_test_config(url: str, **personal) -> ConfigData:
+    """
+    Creates a complete config based on the default config of the package, which accesses the harvest api at
+    the given `url` (usually of a ``MockHarvestServer``). The keyword arguments override the personal values.
+    """
+    data = load_config(os.path.join(PACKAGE_PATH, 'config.yml'))
+    return ConfigData(merge_dicts(data, {
+        'harvest': {'api_url': url, 'account_id': 'id', 'account_token': 'token'},
+        'personal': personal,
+    }))
+
+
+def create_time_entry(entry_id: int,
+                      start: datetime.datetime,
+                      hours: float,
+                      task: str = 'Generic',
+                      project_id: int = 34329740,
+                      user_id: int = 4018067) -> dict:
+    """
+    Creates a dict which has the same structure as a time entry that is returned by the Harvest API, reduced
+    to the fields that are relevant to this package.
+    """
+    timestamp = start.strftime('%Y-%m-%dT%H:%M:%SZ')
+    return {
+        'id': entry_id,
+        'spent_date': start.strftime('%Y-%m-%d'),
+        'hours': hours,
+        'created_at': timestamp,
+        'updated_at': timestamp,
+        'user': {'id': user_id, 'name': 'Max Mustermann'},
+        'project': {'id': project_id, 'name': 'AIMAT HIWI', 'code': 'hiwi'},
+        'task': {'id': 19476422, 'name': task},
+    }
+
+
+def generate_time_entries(num: int,
+                          start: datetime.datetime = datetime.datetime(2022, 1, 3, 9),
+                          hours: float = 2.5,
+                          project_id: int = 34329740,
+                          user_id: int = 4018067) -> List[dict]:
+    """
+    Generates `num` synthetic time entries, one per day beginning at `start`.
+    """
+    return [
+        create_time_entry(
+            entry_id=i + 1,
+            start=start + datetime.timedelta(days=i),
+            hours=hours,
+            task=f'task {i % 5}',
+            project_id=project_id,
+            user_id=user_id,
+        )
+        for i in range(num)
+    ]
+
+
+class MockHarvestServer:
+    """
+    A local stand-in for the Harvest REST API, which can be used to test the ``HarvestApi`` without an actual
+    harvest account. The server runs in a background thread and serves the "projects", "time_entries" and
+    "users" endpoints from the given in-memory lists. The most important query parameters (pagination,
+    project_id, user_id and the from / to date window) are honored the same way as by the real API.
+
+    Every request is recorded in the ``requests`` list as a tuple (path, params). The responses carry an
+    "ETag" header and conditional requests are answered with "304 Not Modified".
+
+    Just like the real API, the responses are gzip compressed if the client accepts that. The number of
+    compressed responses is counted in ``num_compressed``.
+
+    To simulate the rate limiting of the real API, `throttle` can map tuples (path, page) to the number of
+    times that this page is answered with "429 Too Many Requests" before it is served normally.
+
+    .. code-block:: python
+
+        with MockHarvestServer(time_entries=generate_time_entries(100)) as server:
+            api = HarvestApi(url=server.url, account_id='id', account_token='token')
+            time_entries = api.get_time_entries('34329740')
+    """
+    def __init__(self,
+                 time_entries: Optional[List[dict]] = None,
+                 projects: Optional[List[dict]] = None,
+                 users: Optional[List[dict]] = None,
+                 per_page: int = 100,
+                 throttle: Optional[Dict[Tuple[str, int], int]] = None):
+        self.time_entries = time_entries or []
+        self.projects = projects or [{'id': 34329740, 'name': 'AIMAT HIWI'}]
+        self.users = users or [{'id': 4018067, 'first_name': 'Max', 'last_name': 'Mustermann'}]
+        self.per_page = per_page
+        self.throttle = dict(throttle or {})
+        self.requests = []
+        self.num_compressed = 0
+
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address
+        return f'http://{host}:{port}/'
+
+    def filter_time_entries(self, params: dict) -> List[dict]:
+        time_entries = self.time_entries
+        if 'project_id' in params:
+            time_entries = [te for te in time_entries if str(te['project']['id']) == params['project_id']]
+        if 'user_id' in params:
+            time_entries = [te for te in time_entries if str(te['user']['id']) == params['user_id']]
+        if 'from' in params:
+            time_entries = [te for te in time_entries if te['spent_date'] >= params['from']]
+        if 'to' in params:
+            time_entries = [te for te in time_entries if te['spent_date'] <= params['to']]
+        if 'updated_since' in params:
+            time_entries = [te for te in time_entries if te['updated_at'] >= params['updated_since']]
+
+        return time_entries
+
+    def paginate(self, key: str, items: List[dict], params: dict) -> dict:
+        page = int(params.get('page', 1))
+        total_pages = max(1, math.ceil(len(items) / self.per_page))
+        start = (page - 1) * self.per_page
+        return {
+            key: items[start:start + self.per_page],
+            'per_page': self.per_page,
+            'total_pages': total_pages,
+            'total_entries': len(items),
+            'page': page,
+            'next_page': page + 1 if page < total_pages else None,
+            'previous_page': page - 1 if page > 1 else None,
+        }
+
+    def handle(self, path: str, params: dict) -> Tuple[int, dict]:
+        self.requests.append((path, params))
+        key = (path, int(params.get('page', 1)))
+        if self.throttle.get(key, 0) > 0:
+            self.throttle[key] -= 1
+            return 429, {'error': 'too_many_requests'}
+
+        if path == '/time_entries':
+            return 200, self.paginate('time_entries', self.filter_time_entries(params), params)
+        elif path == '/projects':
+            return 200, self.paginate('projects', self.projects, params)
+        elif path.startswith('/users/'):
+            for user in self.users:
+                if path == f'/users/{user["id"]}':
+                    return 200, user
+
+            return 404, {'error': 'not_found'}
+        else:
+            return 404, {'error': 'not_found'}
+
+    def start(self) -> None:
+        mock = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                url = urllib.parse.urlparse(self.path)
+                params = dict(urllib.parse.parse_qsl(url.query))
+                status, data = mock.handle(url.path, params)
+                content = json.dumps(data).encode()
+
+                # Just like the real API, the server supports conditional requests through ETags
+                etag = '"{}"'.format(hashlib.md5(content).hexdigest())
+                if status == 200 and self.headers.get('If-None-Match') == etag:
+                    status, content = 304, b''
+
+                compress = 'gzip' in self.headers.get('Accept-Encoding', '') and len(content) > 0
+                if compress:
+                    content = gzip.compress(content)
+                    mock.num_compressed += 1
+
+                self.send_response(status)
+                if status == 429:
+                    self.send_header('Retry-After', '0')
+                if compress:
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()